@@ -0,0 +1,243 @@
+"""
+End-to-end benchmark for the `smart-commit commit` pipeline.
+
+Builds synthetic git repositories, stages a diff of a given size and runs
+`commit --no-confirm` against a local mock provider with a configurable
+latency. Each case runs in a fresh interpreter so startup time and peak RSS
+are measured per case. Results are written as JSON so runs can be compared
+across releases.
+
+    python benchmarks/bench_commit.py --files 10,1000 --diff-sizes 1KB,1MB
+    python benchmarks/bench_commit.py --preset full -o results.json
+    python benchmarks/bench_commit.py --preset small --compare baseline.json
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRESETS = {
+    "small": {"files": [10, 1000], "diff_sizes": ["1KB", "64KB"]},
+    "medium": {"files": [10, 1000, 10000], "diff_sizes": ["1KB", "1MB", "16MB"]},
+    "full": {"files": [10, 1000, 10000, 100000], "diff_sizes": ["1KB", "1MB", "50MB", "500MB"]},
+}
+
+MOCK_MESSAGE = "⚡ perf(bench): synthetic change"
+LINE = "x" * 64
+
+
+def parse_size(text):
+    """Parse a size such as 512, 1KB, 16MB or 1GB into bytes."""
+    text = text.strip().upper()
+    for suffix, factor in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, stdout=subprocess.DEVNULL)
+
+
+def make_repo(path, n_files, diff_bytes):
+    """Create a repo with n_files committed files and ~diff_bytes of staged changes."""
+    os.makedirs(path)
+    git(path, "init", "-q")
+    git(path, "config", "user.name", "bench")
+    git(path, "config", "user.email", "bench@example.com")
+    git(path, "config", "commit.gpgsign", "false")
+
+    names = []
+    for i in range(n_files):
+        name = os.path.join(f"pkg{i // 100:04d}", f"module_{i:06d}.py")
+        names.append(name)
+        os.makedirs(os.path.join(path, os.path.dirname(name)), exist_ok=True)
+        with open(os.path.join(path, name), "w") as f:
+            f.write(f"def func_{i}():\n    return {i}\n")
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", "initial")
+
+    # Spread the change over up to 100 files so diffs have realistic hunks
+    touched = names[:min(len(names), 100)]
+    per_file = max(diff_bytes // len(touched), len(LINE) + 16)
+    written = 0
+    for n, name in enumerate(touched):
+        if written >= diff_bytes:
+            break
+        with open(os.path.join(path, name), "a") as f:
+            size = 0
+            i = 0
+            while size < per_file:
+                line = f"v_{n}_{i} = '{LINE}'\n"
+                f.write(line)
+                size += len(line)
+                i += 1
+        written += size
+    git(path, "add", "-A")
+
+
+def run_case(repo, latency):
+    """Run one commit in this interpreter and return its measurements."""
+    import resource
+
+    started = time.perf_counter()
+    import smart_commit.main as main
+    from click.testing import CliRunner
+    import_time = time.perf_counter() - started
+
+    stages = {}
+    prompt_chars = []
+
+    def timed(name, fn):
+        def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stages[name] = stages.get(name, 0.0) + time.perf_counter() - t
+        return wrapper
+
+    def mock_generate(prompt):
+        prompt_chars.append(len(prompt))
+        time.sleep(latency)
+        return MOCK_MESSAGE
+
+    main.load_config = timed("load_config", main.load_config)
+    main.initialize = timed("initialize", lambda **kwargs: mock_generate)
+    main.get_git_diff = timed("git_diff", main.get_git_diff)
+    main.get_staged_files = timed("staged_files", main.get_staged_files)
+    main.build_prompt = timed("build_prompt", main.build_prompt)
+    main.commit_with_message = timed("git_commit", main.commit_with_message)
+    mock_generate = timed("generate", mock_generate)
+
+    os.chdir(repo)
+    t = time.perf_counter()
+    result = CliRunner().invoke(main.cli, ["commit", "--no-confirm", "--no-cache"])
+    total = time.perf_counter() - t
+    if result.exit_code != 0:
+        raise RuntimeError(result.output)
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        rss *= 1024  # ru_maxrss is in KiB on Linux, bytes on macOS
+
+    return {
+        "import_s": round(import_time, 6),
+        "commit_s": round(total, 6),
+        "stages_s": {k: round(v, 6) for k, v in stages.items()},
+        "peak_rss_bytes": rss,
+        "prompt_chars": sum(prompt_chars),
+        "prompt_tokens_est": sum(prompt_chars) // 4,
+    }
+
+
+def run_isolated(repo, latency):
+    """Run a case in a fresh interpreter so import time and RSS are not shared."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", repo, "--latency", str(latency)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def environment():
+    git_version = subprocess.check_output(["git", "--version"], text=True).strip()
+    try:
+        from importlib.metadata import version
+        smart_commit_version = version("smart-commit")
+    except Exception:
+        smart_commit_version = "unknown"
+    return {
+        "smart_commit": smart_commit_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git_version,
+    }
+
+
+def compare(results, baseline):
+    """Print the relative change of each case's timings against a baseline run."""
+    base = {(c["files"], c["diff_bytes"]): c for c in baseline["cases"]}
+    for case in results["cases"]:
+        old = base.get((case["files"], case["diff_bytes"]))
+        if not old:
+            continue
+        click.echo(f"files={case['files']} diff={case['diff_bytes']}B", err=True)
+        for key in ("import_s", "commit_s"):
+            click.echo(f"  {key:<14} {_delta(old[key], case[key])}", err=True)
+        for stage, value in case["stages_s"].items():
+            if stage in old["stages_s"]:
+                click.echo(f"  {stage:<14} {_delta(old['stages_s'][stage], value)}", err=True)
+        click.echo(f"  {'peak_rss':<14} {_delta(old['peak_rss_bytes'], case['peak_rss_bytes'])}", err=True)
+
+
+def _delta(old, new):
+    if not old:
+        return f"{new}"
+    return f"{old:.4g} -> {new:.4g} ({(new - old) / old * 100:+.1f}%)"
+
+
+@click.command()
+@click.option("--preset", type=click.Choice(sorted(PRESETS)), default="small", show_default=True)
+@click.option("--files", "files_opt", default=None, help="Comma-separated file counts, e.g. 10,1000")
+@click.option("--diff-sizes", default=None, help="Comma-separated diff sizes, e.g. 1KB,1MB")
+@click.option("--latency", default=0.05, show_default=True, help="Mock provider latency in seconds")
+@click.option("--repeat", default=1, show_default=True, help="Runs per case")
+@click.option("--workdir", default=None, help="Where to create repos (default: temp dir)")
+@click.option("-o", "--output", default=None, help="Write JSON results to this file")
+@click.option("--compare", "baseline_path", default=None, help="Baseline JSON to compare against")
+@click.option("--run-case", "case_repo", default=None, hidden=True)
+def bench(preset, files_opt, diff_sizes, latency, repeat, workdir, output, baseline_path, case_repo):
+    """Benchmark smart-commit's commit pipeline on synthetic repositories"""
+    if case_repo:
+        click.echo(json.dumps(run_case(case_repo, latency)))
+        return
+
+    files = [int(f) for f in files_opt.split(",")] if files_opt else PRESETS[preset]["files"]
+    sizes = [parse_size(s) for s in diff_sizes.split(",")] if diff_sizes else \
+        [parse_size(s) for s in PRESETS[preset]["diff_sizes"]]
+
+    root = tempfile.mkdtemp(prefix="smart-commit-bench-", dir=workdir)
+    results = {"environment": environment(), "latency_s": latency, "cases": []}
+    try:
+        for n_files in files:
+            for diff_bytes in sizes:
+                runs = []
+                for r in range(repeat):
+                    repo = os.path.join(root, f"repo-{n_files}-{diff_bytes}-{r}")
+                    t = time.perf_counter()
+                    make_repo(repo, n_files, diff_bytes)
+                    setup_s = time.perf_counter() - t
+                    runs.append(run_isolated(repo, latency))
+                    shutil.rmtree(repo, ignore_errors=True)
+                    click.echo(f"files={n_files} diff={diff_bytes}B run={r + 1} "
+                               f"setup={setup_s:.2f}s commit={runs[-1]['commit_s']:.3f}s", err=True)
+                # Report the fastest run; the others are mostly noise from the host
+                best = min(runs, key=lambda run: run["commit_s"])
+                results["cases"].append({"files": n_files, "diff_bytes": diff_bytes, "runs": repeat, **best})
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        click.echo(text)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,132 @@
+"""
+Startup-time comparison for smart-commit binary variants.
+
+Runs each variant's command (by default `--help`) several times and reports
+wall-clock startup times. Variants found in dist/ after ./build_binary.sh
+are picked up automatically, alongside the plain Python install:
+
+    ./build_binary.sh --mode onefile
+    ./build_binary.sh --mode onedir --providers openai
+    python benchmarks/bench_startup.py --runs 20 -o startup.json
+    python benchmarks/bench_startup.py --variant mine=/usr/local/bin/smart-commit
+    python benchmarks/bench_startup.py --compare startup.json
+"""
+import json
+import os
+import platform
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_VARIANTS = {
+    "python": [sys.executable, "-m", "smart_commit.main"],
+    "onefile": [os.path.join(REPO_ROOT, "dist", "smart-commit")],
+    "onedir": [os.path.join(REPO_ROOT, "dist", "onedir", "smart-commit", "smart-commit")],
+}
+
+
+def available_variants():
+    """Return the default variants whose executables exist."""
+    return {
+        name: cmd for name, cmd in DEFAULT_VARIANTS.items()
+        if cmd[0] == sys.executable or os.path.isfile(cmd[0])
+    }
+
+
+def time_command(cmd, runs, warmup=1):
+    """Run cmd `warmup` + `runs` times and return the timed runs' durations in seconds."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    durations = []
+    for i in range(warmup + runs):
+        started = time.perf_counter()
+        subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if i >= warmup:
+            durations.append(time.perf_counter() - started)
+    return durations
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+    return {
+        "runs": len(ordered),
+        "min_s": round(ordered[0], 6),
+        "median_s": round(statistics.median(ordered), 6),
+        "p90_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 6),
+        "mean_s": round(statistics.mean(ordered), 6),
+    }
+
+
+def size_bytes(path):
+    """Return the size of a file, or of a whole onedir build for its executable."""
+    root = os.path.dirname(path)
+    if os.path.isdir(os.path.join(root, "_internal")):
+        return sum(
+            os.path.getsize(os.path.join(dirpath, name))
+            for dirpath, _, names in os.walk(root) for name in names
+        )
+    return os.path.getsize(path) if os.path.isfile(path) else None
+
+
+def compare(results, baseline):
+    """Print each variant's median startup change against a baseline run."""
+    for name, variant in results["variants"].items():
+        old = baseline["variants"].get(name)
+        if not old:
+            continue
+        delta = (variant["median_s"] - old["median_s"]) / old["median_s"] * 100
+        click.echo(f"{name:<10} {old['median_s']:.4f}s -> {variant['median_s']:.4f}s ({delta:+.1f}%)", err=True)
+
+
+@click.command()
+@click.option("--variant", "variants_opt", multiple=True, metavar="NAME=COMMAND",
+              help="Extra variant to time, e.g. mine=/usr/local/bin/smart-commit")
+@click.option("--only", default=None, help="Comma-separated variant names to run")
+@click.option("--args", "cmd_args", default="--help", show_default=True, help="Arguments passed to every variant")
+@click.option("--runs", default=10, show_default=True, help="Timed runs per variant")
+@click.option("--warmup", default=1, show_default=True, help="Untimed runs per variant")
+@click.option("-o", "--output", default=None, help="Write JSON results to this file")
+@click.option("--compare", "baseline_path", default=None, help="Baseline JSON to compare against")
+def bench(variants_opt, only, cmd_args, runs, warmup, output, baseline_path):
+    """Compare startup time of smart-commit binary variants"""
+    variants = available_variants()
+    for spec in variants_opt:
+        name, sep, command = spec.partition("=")
+        if not sep:
+            raise click.BadParameter(f"expected NAME=COMMAND, got '{spec}'", param_hint="--variant")
+        variants[name] = shlex.split(command)
+    if only:
+        variants = {name: cmd for name, cmd in variants.items() if name in only.split(",")}
+
+    results = {
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "args": cmd_args,
+        "variants": {},
+    }
+    for name, cmd in variants.items():
+        durations = time_command(cmd + shlex.split(cmd_args), runs, warmup)
+        summary = summarize(durations)
+        summary["command"] = cmd
+        summary["size_bytes"] = None if cmd[0] == sys.executable else size_bytes(cmd[0])
+        results["variants"][name] = summary
+        click.echo(f"{name:<10} median={summary['median_s']:.4f}s min={summary['min_s']:.4f}s", err=True)
+
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        click.echo(text)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    bench()
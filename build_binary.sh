@@ -1,11 +1,50 @@
 #!/bin/bash
 
 # Build Standalone Binary for Smart Commit
-# This script creates a single executable file that doesn't require Python installation
+# This script creates an executable that doesn't require Python installation
+#
+# Usage: ./build_binary.sh [--mode onefile|onedir] [--providers google,anthropic,openai]
+#
+#   --mode onefile   A single file (default). It unpacks itself to a temp
+#                    dir on every launch, which costs a few hundred ms.
+#   --mode onedir    A directory with the executable and its libraries
+#                    already unpacked. Starts much faster; ship it as the
+#                    .tar.gz archive the build creates.
+#   --providers      Provider SDKs to bundle (default: all). Leaving out
+#                    SDKs you don't use makes the build smaller.
 
 set -e
 
-echo "🔨 Building Smart Commit Standalone Binary"
+MODE="onefile"
+PROVIDERS="google,anthropic,openai"
+
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --mode)
+            MODE="$2"
+            shift 2
+            ;;
+        --providers)
+            PROVIDERS="$2"
+            shift 2
+            ;;
+        -h|--help)
+            sed -n '6,14p' "$0" | sed 's/^# \{0,1\}//'
+            exit 0
+            ;;
+        *)
+            echo "❌ Unknown option: $1"
+            exit 1
+            ;;
+    esac
+done
+
+if [ "$MODE" != "onefile" ] && [ "$MODE" != "onedir" ]; then
+    echo "❌ --mode must be onefile or onedir"
+    exit 1
+fi
+
+echo "🔨 Building Smart Commit Standalone Binary ($MODE)"
 echo "=========================================="
 echo ""
 
@@ -17,17 +56,47 @@ fi
 
 echo "✅ PyInstaller found"
 
+# Provider SDKs are imported lazily, so each one is either bundled explicitly or excluded
+PROVIDER_ARGS=()
+for provider in google anthropic openai; do
+    if [[ ",$PROVIDERS," == *",$provider,"* ]]; then
+        echo "📦 Bundling provider: $provider"
+        case "$provider" in
+            google) PROVIDER_ARGS+=(--hidden-import google.generativeai) ;;
+            anthropic) PROVIDER_ARGS+=(--hidden-import anthropic) ;;
+            openai) PROVIDER_ARGS+=(--hidden-import openai) ;;
+        esac
+    else
+        echo "➖ Leaving out provider: $provider"
+        case "$provider" in
+            google) PROVIDER_ARGS+=(--exclude-module google.generativeai --exclude-module google.ai.generativelanguage) ;;
+            anthropic) PROVIDER_ARGS+=(--exclude-module anthropic) ;;
+            openai) PROVIDER_ARGS+=(--exclude-module openai) ;;
+        esac
+    fi
+done
+
 # Create build directory
 mkdir -p dist
 
+if [ "$MODE" = "onedir" ]; then
+    DIST_PATH="dist/onedir"
+    BINARY="$DIST_PATH/smart-commit/smart-commit"
+else
+    DIST_PATH="dist"
+    BINARY="dist/smart-commit"
+fi
+
 echo "📦 Building standalone binary..."
 
 # Build the binary
 pyinstaller \
-    --onefile \
+    --$MODE \
+    --noconfirm \
     --name smart-commit \
+    --distpath "$DIST_PATH" \
     --add-data "smart_commit/config.yml:smart_commit" \
-    --hidden-import google.generativeai \
+    "${PROVIDER_ARGS[@]}" \
     --hidden-import pydantic \
     --hidden-import yaml \
     --hidden-import click \
@@ -38,25 +107,38 @@ if [ $? -eq 0 ]; then
     echo ""
     echo "✅ Binary built successfully!"
     echo ""
-    echo "📁 Output location: dist/smart-commit"
+    echo "📁 Output location: $BINARY"
     echo ""
     echo "📊 File size:"
-    ls -lh dist/smart-commit
+    if [ "$MODE" = "onedir" ]; then
+        du -sh "$DIST_PATH/smart-commit"
+        tar -czf dist/smart-commit-onedir.tar.gz -C "$DIST_PATH" smart-commit
+        echo "📦 Archive: dist/smart-commit-onedir.tar.gz"
+    else
+        ls -lh "$BINARY"
+    fi
     echo ""
     echo "🧪 Testing the binary..."
-    
+
     # Test the binary
-    if [ -f "dist/smart-commit" ]; then
+    if [ -f "$BINARY" ]; then
         echo "✅ Binary file created successfully!"
         echo ""
         echo "🎉 Your standalone binary is ready!"
         echo ""
         echo "📋 How to use:"
-        echo "1. Copy dist/smart-commit to any directory"
-        echo "2. Make it executable: chmod +x smart-commit"
-        echo "3. Run: ./smart-commit --help"
+        if [ "$MODE" = "onedir" ]; then
+            echo "1. Copy the $DIST_PATH/smart-commit directory anywhere (keep its contents together)"
+            echo "2. Link the executable onto your PATH: ln -s \"\$PWD/smart-commit/smart-commit\" ~/.local/bin/"
+            echo "3. Run: smart-commit --help"
+        else
+            echo "1. Copy dist/smart-commit to any directory"
+            echo "2. Make it executable: chmod +x smart-commit"
+            echo "3. Run: ./smart-commit --help"
+        fi
         echo ""
         echo "💡 The binary contains everything needed - no Python installation required!"
+        echo "⏱️  Compare startup times with: python benchmarks/bench_startup.py"
     else
         echo "❌ Binary file not found. Check the build output above."
         exit 1
@@ -20,8 +20,8 @@ setup(
     install_requires=[
         "click>=8.0.0",
         "google-generativeai>=0.8.0",
-        "anthropic>=0.25.0",
-        "openai>=1.0.0",
+        "anthropic>=0.42.0",   # messages.batches and messages.count_tokens
+        "openai>=1.40.0",      # json_schema response_format and DefaultHttpxClient
         "python-dotenv>=1.0.0",
         "pydantic>=2.0.0",
         "pyyaml>=6.0",
@@ -0,0 +1,398 @@
+"""
+Bulk offline generation through provider batch APIs.
+
+Jobs, usually one per commit, are submitted through the OpenAI Batch API or
+Anthropic Message Batches, which cost less than synchronous calls but take
+minutes to hours to finish. Runs are tracked in batches.db in the app dir,
+so submitting, polling and collecting can each be resumed later, from
+another process.
+
+A backend has three methods:
+
+- submit([(custom_id, prompt), ...]) -> batch_id
+- status(batch_id) -> "in_progress", "ended" or "failed"
+- results(batch_id) -> iterable of (custom_id, message, error)
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import time
+import uuid
+
+import click
+
+from smart_commit.headless import job_prompt
+from smart_commit.main import _api_key, _client_kwargs, load_env
+
+# Well below both providers' per-batch request limits (50k and 100k)
+MAX_BATCH_SIZE = 10000
+
+
+def batches_path():
+    """Return the path of the batch run state in the app dir."""
+    return os.path.join(click.get_app_dir("smart-commit"), "batches.db")
+
+
+def _connect():
+    path = batches_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(
+        "CREATE TABLE IF NOT EXISTS runs ("
+        "run_id TEXT PRIMARY KEY, provider TEXT NOT NULL, model TEXT NOT NULL, created REAL NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS batches ("
+        "batch_id TEXT PRIMARY KEY, run_id TEXT NOT NULL, status TEXT NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "run_id TEXT NOT NULL, custom_id TEXT NOT NULL, job_id TEXT NOT NULL, prompt TEXT, "
+        "batch_id TEXT, status TEXT NOT NULL, message TEXT, error TEXT, "
+        "PRIMARY KEY (run_id, custom_id));"
+    )
+    return conn
+
+
+# ── Jobs from history ───────────────────────────────
+
+def commit_jobs(rev_range="HEAD", max_count=None, with_message=False):
+    """Return one {"id": sha, "diff": ...} job per non-merge commit in rev_range.
+
+    Reads every diff with a single `git log -p`. Commits without a diff,
+    such as empty commits, are skipped. With with_message, each job also
+    carries the commit's own message as "reference".
+    """
+    # %x1f/%x1e delimit the message, which may contain blank lines of its own
+    fmt = "--format=%x00%H%x1f%B%x1e" if with_message else "--format=%x00%H"
+    cmd = ["git", "log", "--no-merges", "--no-color", fmt, "-p"]
+    if max_count:
+        cmd.append(f"--max-count={max_count}")
+    out = subprocess.run(
+        cmd + [rev_range, "--"], stdout=subprocess.PIPE, check=True
+    ).stdout.decode("utf-8", errors="replace")
+
+    jobs = []
+    for entry in out.split("\0")[1:]:
+        if with_message:
+            sha, _, rest = entry.partition("\x1f")
+            message, _, diff = rest.partition("\x1e")
+        else:
+            sha, _, diff = entry.partition("\n")
+        if diff.strip():
+            job = {"id": sha.strip(), "diff": diff}
+            if with_message:
+                job["reference"] = message.strip()
+            jobs.append(job)
+    return jobs
+
+
+# ── Runs ────────────────────────────────────────────
+
+def create_run(config, jobs, provider=None, model=None):
+    """Store the prompts for jobs as a new run and return its id."""
+    provider = provider or config.ai.provider
+    model = model or config.ai.model
+    # Batch requests are plain completions, so structured prompts don't apply here
+    config = config.model_copy(update={"ai": config.ai.model_copy(update={"structured": False})})
+    run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    rows = []
+    for n, job in enumerate(jobs):
+        # Anthropic limits custom ids to [A-Za-z0-9_-]{1,64}, so job ids map through the table
+        custom_id = f"job-{n}"
+        try:
+            prompt, _ = job_prompt(config, job)
+            rows.append((run_id, custom_id, str(job["id"]), prompt, None, "pending", None, None))
+        except ValueError as e:
+            rows.append((run_id, custom_id, str(job["id"]), None, None, "failed", None, str(e)))
+
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?)", (run_id, provider, model, time.time()))
+            conn.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
+    return run_id
+
+def get_run(run_id):
+    """Return {"run_id", "provider", "model", "created"} for a run, or raise ValueError."""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT run_id, provider, model, created FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        raise ValueError(f"Unknown batch run '{run_id}'. See 'smart-commit batch list'.")
+    return dict(zip(("run_id", "provider", "model", "created"), row))
+
+def list_runs():
+    """Return every run, newest first, with its job counts per status."""
+    conn = _connect()
+    try:
+        runs = conn.execute(
+            "SELECT run_id, provider, model, created FROM runs ORDER BY created DESC"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        dict(zip(("run_id", "provider", "model", "created"), row), counts=run_counts(row[0]))
+        for row in runs
+    ]
+
+def run_counts(run_id):
+    """Return {status: number of jobs} for a run."""
+    conn = _connect()
+    try:
+        return dict(conn.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY status", (run_id,)
+        ).fetchall())
+    finally:
+        conn.close()
+
+def run_results(run_id):
+    """Return [{"id", "status", "message", "error"}] for a run's jobs in submission order."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT job_id, status, message, error FROM jobs WHERE run_id = ? ORDER BY rowid", (run_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(("id", "status", "message", "error"), row)) for row in rows]
+
+
+def submit_run(run_id, backend, batch_size=MAX_BATCH_SIZE):
+    """Submit a run's pending jobs in batches of at most batch_size; return the new batch ids.
+
+    Each batch is recorded as soon as the provider accepts it, so calling
+    this again after a failure only submits what is still pending.
+    """
+    batch_ids = []
+    while True:
+        conn = _connect()
+        try:
+            pending = conn.execute(
+                "SELECT custom_id, prompt FROM jobs WHERE run_id = ? AND status = 'pending' "
+                "ORDER BY rowid LIMIT ?", (run_id, batch_size)
+            ).fetchall()
+        finally:
+            conn.close()
+        if not pending:
+            return batch_ids
+
+        batch_id = backend.submit(pending)
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("INSERT INTO batches VALUES (?, ?, 'in_progress')", (batch_id, run_id))
+                conn.executemany(
+                    "UPDATE jobs SET status = 'submitted', batch_id = ?, prompt = NULL "
+                    "WHERE run_id = ? AND custom_id = ?",
+                    [(batch_id, run_id, custom_id) for custom_id, _ in pending],
+                )
+        finally:
+            conn.close()
+        batch_ids.append(batch_id)
+
+def poll_run(run_id, backend):
+    """Check a run's open batches once, storing the results of finished ones.
+
+    Returns the run's job counts per status.
+    """
+    conn = _connect()
+    try:
+        open_batches = [row[0] for row in conn.execute(
+            "SELECT batch_id FROM batches WHERE run_id = ? AND status = 'in_progress'", (run_id,)
+        )]
+    finally:
+        conn.close()
+
+    for batch_id in open_batches:
+        status = backend.status(batch_id)
+        if status == "in_progress":
+            continue
+        results = list(backend.results(batch_id)) if status == "ended" else []
+
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE jobs SET status = ?, message = ?, error = ? "
+                    "WHERE run_id = ? AND custom_id = ? AND batch_id = ?",
+                    [("failed" if error else "done", message, error, run_id, custom_id, batch_id)
+                     for custom_id, message, error in results],
+                )
+                # Jobs the provider never answered, e.g. because the batch expired
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ? "
+                    "WHERE run_id = ? AND batch_id = ? AND status = 'submitted'",
+                    (f"no result (batch {status})", run_id, batch_id),
+                )
+                conn.execute("UPDATE batches SET status = ? WHERE batch_id = ?", (status, batch_id))
+        finally:
+            conn.close()
+    return run_counts(run_id)
+
+def wait_for_run(run_id, backend, interval=60.0, sleep=time.sleep):
+    """Poll a run until none of its jobs are still in flight; return its job counts."""
+    while True:
+        counts = poll_run(run_id, backend)
+        if not counts.get("submitted"):
+            return counts
+        sleep(interval)
+
+
+# ── Backends ────────────────────────────────────────
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API over /v1/chat/completions."""
+
+    def __init__(self, client, model, max_tokens=1024):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def submit(self, requests):
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "max_tokens": self.max_tokens,
+                },
+            })
+            for custom_id, prompt in requests
+        ]
+        upload = self.client.files.create(
+            file=("smart-commit-batch.jsonl", ("\n".join(lines) + "\n").encode("utf-8")),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        status = self.client.batches.retrieve(batch_id).status
+        if status in ("completed", "expired", "cancelled"):
+            return "ended"
+        if status == "failed":
+            return "failed"
+        return "in_progress"
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                body = response.get("body") or {}
+                error = record.get("error") or body.get("error")
+                if error or response.get("status_code") != 200:
+                    message = (error or {}).get("message") or f"HTTP {response.get('status_code')}"
+                    yield record["custom_id"], None, message
+                else:
+                    yield record["custom_id"], body["choices"][0]["message"]["content"].strip(), None
+
+
+class AnthropicBatchBackend:
+    """Anthropic Message Batches."""
+
+    def __init__(self, client, model, max_tokens=1024):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def submit(self, requests):
+        batch = self.client.messages.batches.create(requests=[
+            {
+                "custom_id": custom_id,
+                "params": {
+                    "model": self.model,
+                    "max_tokens": self.max_tokens,
+                    "messages": [{"role": "user", "content": prompt}],
+                },
+            }
+            for custom_id, prompt in requests
+        ])
+        return batch.id
+
+    def status(self, batch_id):
+        status = self.client.messages.batches.retrieve(batch_id).processing_status
+        return "ended" if status == "ended" else "in_progress"
+
+    def results(self, batch_id):
+        for entry in self.client.messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                yield entry.custom_id, result.message.content[0].text.strip(), None
+            else:
+                error = getattr(getattr(getattr(result, "error", None), "error", None), "message", None)
+                yield entry.custom_id, None, error or result.type
+
+
+class FakeBatchBackend:
+    """Local stand-in for a provider batch API, for tests and dry runs.
+
+    Batches are JSON files in `root`, so a new instance over the same
+    directory sees earlier submissions just like a real provider would.
+    A batch ends after `polls` status checks; results come from generate(prompt).
+    """
+
+    def __init__(self, root, generate, polls=1):
+        self.root = root
+        self.generate = generate
+        self.polls = polls
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, batch_id):
+        return os.path.join(self.root, batch_id + ".json")
+
+    def _load(self, batch_id):
+        with open(self._path(batch_id), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self, batch_id, state):
+        with open(self._path(batch_id), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    def submit(self, requests):
+        batch_id = "fakebatch-" + uuid.uuid4().hex[:12]
+        self._save(batch_id, {"requests": [list(r) for r in requests], "polls": 0})
+        return batch_id
+
+    def status(self, batch_id):
+        state = self._load(batch_id)
+        state["polls"] += 1
+        self._save(batch_id, state)
+        return "ended" if state["polls"] >= self.polls else "in_progress"
+
+    def results(self, batch_id):
+        for custom_id, prompt in self._load(batch_id)["requests"]:
+            try:
+                yield custom_id, self.generate(prompt), None
+            except Exception as e:
+                yield custom_id, None, str(e)
+
+
+def batch_backend(provider, model, endpoint=None, max_tokens=1024):
+    """Return the batch backend for provider, honouring an EndpointConfig."""
+    load_env()
+    if provider == "openai":
+        import openai as openai_sdk
+        client = openai_sdk.OpenAI(api_key=_api_key("openai", endpoint), **_client_kwargs(endpoint, openai_sdk))
+        return OpenAIBatchBackend(client, model, max_tokens)
+    if provider == "anthropic":
+        import anthropic as anthropic_sdk
+        client = anthropic_sdk.Anthropic(
+            api_key=_api_key("anthropic", endpoint), **_client_kwargs(endpoint, anthropic_sdk)
+        )
+        return AnthropicBatchBackend(client, model, max_tokens)
+    raise ValueError(f"Batch mode is not available for provider '{provider}'. Choose: openai, anthropic")
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+import click
+
+
+def cache_path():
+    """Return the path of the response cache database in the app dir."""
+    return os.path.join(click.get_app_dir("smart-commit"), "cache.db")
+
+
+def _connect():
+    path = cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "key TEXT PRIMARY KEY, message TEXT NOT NULL, created REAL NOT NULL)"
+    )
+    return conn
+
+
+def cache_key(provider: str, model: str, prompt: str) -> str:
+    """Return the cache key for a prompt sent to a given provider and model."""
+    h = hashlib.sha256()
+    for part in (provider, model, prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def get_cached_message(key: str, max_age: float = None):
+    """Return the cached message for key, or None if missing or older than max_age seconds."""
+    try:
+        conn = _connect()
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT message, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    message, created = row
+    if max_age is not None and time.time() - created > max_age:
+        return None
+    return message
+
+
+def put_cached_message(key: str, message: str):
+    """Store a generated message under key, replacing any previous entry."""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, message, created) VALUES (?, ?, ?)",
+                (key, message, time.time()),
+            )
+    finally:
+        conn.close()
+
+
+def drop_cached_message(key: str):
+    """Remove a cached message, e.g. after the user rejected it."""
+    try:
+        conn = _connect()
+    except sqlite3.Error:
+        return
+    try:
+        with conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+    except sqlite3.Error:
+        pass
+    finally:
+        conn.close()
@@ -0,0 +1,157 @@
+"""
+Detect binary, generated and vendored files in a staged diff.
+
+Classified files are replaced by a one-line summary before the prompt is
+built, so lock files, minified bundles, snapshots and images don't eat the
+token budget.
+"""
+import re
+import subprocess
+
+from smart_commit.config_loader import DEFAULT_EXCLUDE_GLOBS
+from smart_commit.semantic import split_diff
+
+
+def glob_to_regex(pattern):
+    """Translate a gitignore-style glob into a regex fragment.
+
+    `**` crosses directories, `*` and `?` don't. Patterns without a slash
+    match at any depth, like in .gitignore.
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        else:
+            out.append(re.escape(c))
+        i += 1
+    regex = "".join(out)
+    if "/" not in pattern.rstrip("/"):
+        regex = "(?:.*/)?" + regex
+    return regex
+
+def compile_globs(patterns):
+    """Compile glob patterns into a single regex, or None if there are none."""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{glob_to_regex(p)})" for p in patterns) + r"\Z")
+
+
+def git_attributes(paths, repo=None):
+    """Return {path: {attr: value}} for linguist-generated and diff from .gitattributes.
+
+    repo is the work tree to ask, by default the current directory.
+    """
+    if not paths:
+        return {}
+    try:
+        out = subprocess.run(
+            ["git", "check-attr", "-z", "--stdin", "linguist-generated", "diff"],
+            input="".join(p + "\0" for p in paths).encode("utf-8"),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, cwd=repo,
+        ).stdout.decode("utf-8", errors="replace")
+    except (subprocess.CalledProcessError, OSError):
+        return {}
+    fields = out.split("\0")
+    attrs = {}
+    for i in range(0, len(fields) - 2, 3):
+        path, attr, value = fields[i:i + 3]
+        attrs.setdefault(path, {})[attr] = value
+    return attrs
+
+
+class FileClassifier:
+    """Classify paths as binary, generated or excluded, caching results per path."""
+
+    def __init__(self, exclude_globs=DEFAULT_EXCLUDE_GLOBS, repo=None):
+        self.pattern = compile_globs(exclude_globs)
+        self.repo = repo
+        self._cache = {}
+
+    def classify(self, paths, binary=()):
+        """Return {path: reason} for every path that should be left out of the prompt.
+
+        Paths in `binary` are known to be binary from the diff itself.
+        """
+        unknown = [p for p in paths if p not in self._cache]
+        if unknown:
+            attrs = git_attributes(unknown, repo=self.repo)
+            for path in unknown:
+                self._cache[path] = self._classify_one(path, attrs.get(path, {}))
+
+        result = {}
+        for path in paths:
+            reason = self._cache[path]
+            if reason is None and path in binary:
+                reason = "binary"
+            if reason:
+                result[path] = reason
+        return result
+
+    def _classify_one(self, path, attrs):
+        if attrs.get("linguist-generated") in ("set", "true"):
+            return "generated"
+        if attrs.get("diff") == "unset":
+            return "no-diff"
+        if self.pattern and self.pattern.match(path):
+            return "excluded"
+        return None
+
+
+_classifiers = {}
+
+def get_classifier(exclude_globs, repo=None):
+    """Return a shared classifier for a glob list and repo, so patterns compile once per process."""
+    key = (tuple(exclude_globs), repo)
+    if key not in _classifiers:
+        _classifiers[key] = FileClassifier(exclude_globs, repo=repo)
+    return _classifiers[key]
+
+
+def _is_binary_chunk(file_diff):
+    # The same information `git diff --numstat` reports as "-\t-", without another git call
+    return ("\nGIT binary patch\n" in file_diff
+            or re.search(r"(?m)^Binary files .* differ$", file_diff) is not None)
+
+def filter_diff(diff, exclude_globs=DEFAULT_EXCLUDE_GLOBS, repo=None):
+    """Replace the diffs of binary, generated and excluded files with a summary line."""
+    files = split_diff(diff)
+    if not files:
+        return diff
+
+    paths = [new_path or old_path for old_path, new_path, _ in files]
+    binary = {path for path, (_, _, chunk) in zip(paths, files) if _is_binary_chunk(chunk)}
+    classified = get_classifier(exclude_globs, repo).classify(paths, binary=binary)
+    if not classified:
+        return diff
+
+    out = []
+    for path, (_, _, file_diff) in zip(paths, files):
+        reason = classified.get(path)
+        if not reason:
+            out.append(file_diff)
+            continue
+        if reason == "binary":
+            detail = "binary file changed"
+        else:
+            added = deleted = 0
+            for line in file_diff.splitlines():
+                if line.startswith("+") and not line.startswith("+++"):
+                    added += 1
+                elif line.startswith("-") and not line.startswith("---"):
+                    deleted += 1
+            detail = f"{reason} file, +{added}/-{deleted} lines (diff omitted)"
+        out.append(f"diff --git a/{path} b/{path}\n# {detail}\n")
+    return "".join(out).strip()
@@ -1,14 +1,72 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import List, Dict, Literal, Optional, Union
 import yaml
 import os
 
+class EndpointConfig(BaseModel):
+    base_url: Optional[str] = None
+    api_key_env: Optional[str] = None
+    headers: Dict[str, str] = {}
+    timeout: float = Field(gt=0, default=60.0)
+    max_retries: int = Field(ge=0, default=2)
+    proxy: Optional[str] = None
+    verify_ssl: bool = True
+
+class RateLimitConfig(BaseModel):
+    requests_per_minute: Optional[int] = Field(gt=0, default=None)
+    tokens_per_minute: Optional[int] = Field(gt=0, default=None)
+    max_retries: int = Field(ge=0, default=5)
+
+class PriceConfig(BaseModel):
+    input: float = Field(ge=0.0)    # USD per million input tokens
+    output: float = Field(ge=0.0)   # USD per million output tokens
+
+class RouteConfig(BaseModel):
+    model: str                      # "provider/model", or a model of ai.provider
+    max_files: Optional[int] = Field(gt=0, default=None)
+    max_lines: Optional[int] = Field(gt=0, default=None)
+    max_languages: Optional[int] = Field(gt=0, default=None)
+    min_rename_ratio: Optional[float] = Field(ge=0.0, le=1.0, default=None)
+
+class ReplayConfig(BaseModel):
+    mode: Literal["record", "replay", "auto"] = "replay"
+    path: Optional[str] = None      # defaults to replay.db in the app dir
+    latency: Optional[Union[Literal["recorded"], float]] = None   # replay delay in seconds, or "recorded"
+    record_latency: bool = True
+
+DEFAULT_EMOJI_MAP = {
+    "feat": "✨",
+    "fix": "🐛",
+    "docs": "📝",
+    "style": "🎨",
+    "refactor": "♻️",
+    "perf": "⚡",
+    "test": "✅",
+    "build": "👷",
+    "ci": "💚",
+    "chore": "🔧",
+    "revert": "⏪",
+}
+
 class AIConfig(BaseModel):
     provider: str = "google"
     model: str = "gemini-2.5-flash"
     temperature: float = Field(ge=0.0, le=1.0, default=0.7)
-    max_tokens: int = Field(gt=0, default=100)
+    max_tokens: int = Field(gt=0, default=1024)
     rules: List[str] = []
+    cache: bool = True
+    cache_ttl: int = Field(ge=0, default=3600)
+    endpoints: Dict[str, EndpointConfig] = {}
+    rate_limits: Dict[str, RateLimitConfig] = {}
+    structured: bool = False
+    emoji_map: Dict[str, str] = DEFAULT_EMOJI_MAP
+    exact_tokens: bool = False
+    fallback_model: Optional[str] = None
+    max_cost_per_commit: Optional[float] = Field(gt=0.0, default=None)
+    context_windows: Dict[str, int] = {}
+    prices: Dict[str, PriceConfig] = {}
+    routes: List[RouteConfig] = []
+    replay: Optional[ReplayConfig] = None
 
 class CommitConfig(BaseModel):
     auto_emoji: bool = True
@@ -20,11 +78,40 @@ class CommitConfig(BaseModel):
 class GitConfig(BaseModel):
     branch_reference: bool = True
     similar_commits: int = Field(ge=0, default=3)
+    snapshot: bool = False
+
+DEFAULT_EXCLUDE_GLOBS = [
+    "*.lock",
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "pnpm-lock.yaml",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*.snap",
+    "**/__snapshots__/**",
+    "*.pb.go",
+    "*_pb2.py",
+    "*.generated.*",
+    "dist/**",
+    "vendor/**",
+    "node_modules/**",
+]
+
+class DiffConfig(BaseModel):
+    exclude_generated: bool = True
+    exclude_globs: List[str] = DEFAULT_EXCLUDE_GLOBS
+    semantic: bool = False
+    semantic_hunk_lines: int = Field(ge=0, default=20)
+    redact_secrets: bool = True
+    redact_pii: bool = False
 
 class Config(BaseModel):
     ai: AIConfig
     commit: CommitConfig
     git: GitConfig
+    diff: DiffConfig = DiffConfig()
 
 
 def load_config(path: str = None) -> Config:
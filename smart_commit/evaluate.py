@@ -0,0 +1,206 @@
+"""
+Quality and latency regression harness for generated commit messages.
+
+A corpus is a JSONL file of {"id", "diff", "reference"} cases, usually
+extracted from a repository's own history; extracted cases also name their
+"commit", so semantic diff reduction can read its files when the corpus
+runs in that repository. Each case runs through the
+configured pipeline (the same prompt building, diff filtering and provider
+as `smart-commit generate`) and the generated message is scored against
+the reference:
+
+- type and scope accuracy, over the references that follow Conventional Commits
+- subject similarity, a 0..1 word-sequence ratio
+- input/output tokens and latency percentiles
+
+Reports are JSON, so a report can be stored as the baseline for the next
+run. A report also keeps every response by prompt hash, which lets a later
+run replay them offline to check scoring or prompt changes without
+calling the provider.
+"""
+import difflib
+import hashlib
+import json
+import re
+import statistics
+import threading
+
+from smart_commit.headless import run_jobs
+
+_HEADER = re.compile(
+    r"^(?:[^\w\s]\S*\s+)?(?P<type>[a-zA-Z]+)(?:\((?P<scope>[^)]*)\))?(?P<breaking>!)?:\s*(?P<subject>.+)$"
+)
+
+# Metrics where a lower value is better; every other metric is better higher
+LOWER_IS_BETTER = {
+    "errors", "input_tokens_mean", "output_tokens_mean",
+    "latency_p50_s", "latency_p90_s", "latency_p99_s",
+}
+
+
+# ── Corpus ──────────────────────────────────────────
+
+def build_corpus(rev_range="HEAD", max_count=None):
+    """Return (diff, reference message) cases for the non-merge commits in rev_range."""
+    from smart_commit.batch import commit_jobs
+    return [dict(job, commit=job["id"]) for job in commit_jobs(rev_range, max_count, with_message=True)
+            if job["reference"]]
+
+def write_corpus(cases, f):
+    for case in cases:
+        f.write(json.dumps(case) + "\n")
+
+def load_corpus(path, limit=None):
+    """Read a corpus file; every case needs "diff" and "reference"."""
+    cases = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            case = json.loads(line)
+            if not isinstance(case, dict) or "diff" not in case or "reference" not in case:
+                raise ValueError(f"{path}:{n}: expected an object with 'diff' and 'reference'")
+            case.setdefault("id", f"{path}:{n}")
+            cases.append(case)
+            if limit and len(cases) >= limit:
+                break
+    return cases
+
+
+# ── Scoring ─────────────────────────────────────────
+
+def parse_header(message):
+    """Split a message's first line into {"type", "scope", "subject", "breaking"}.
+
+    type and scope are None when the line doesn't follow Conventional Commits.
+    """
+    line = (message or "").strip().splitlines()[0] if (message or "").strip() else ""
+    match = _HEADER.match(line)
+    if not match:
+        return {"type": None, "scope": None, "subject": line, "breaking": False}
+    return {
+        "type": match["type"].lower(),
+        "scope": (match["scope"] or "").strip().lower(),
+        "subject": match["subject"].strip(),
+        "breaking": bool(match["breaking"]),
+    }
+
+def subject_similarity(a, b):
+    """Return a 0..1 similarity of two subjects, compared word by word."""
+    words_a = re.findall(r"\w+", a.lower())
+    words_b = re.findall(r"\w+", b.lower())
+    if not words_a and not words_b:
+        return 1.0
+    return difflib.SequenceMatcher(None, words_a, words_b).ratio()
+
+def score(message, reference):
+    """Score a generated message against its reference."""
+    got = parse_header(message)
+    want = parse_header(reference)
+    scores = {"subject_similarity": round(subject_similarity(got["subject"], want["subject"]), 4)}
+    if want["type"] is not None:
+        scores["type_match"] = got["type"] == want["type"]
+        scores["scope_match"] = got["scope"] == want["scope"]
+    return scores
+
+
+# ── Running ─────────────────────────────────────────
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+def recording(generator_for, responses):
+    """Wrap generator_for so every (message, usage) response is stored by prompt hash."""
+    lock = threading.Lock()
+
+    def recorded_for(provider, model):
+        generate = generator_for(provider, model)
+
+        def wrapper(prompt):
+            message, usage = generate(prompt)
+            with lock:
+                responses[prompt_hash(prompt)] = {"message": message, "usage": usage}
+            return message, usage
+        return wrapper
+    return recorded_for
+
+def replaying(responses):
+    """Return a generator_for serving the responses recorded in a previous report, for any model."""
+    def generate(prompt):
+        response = responses.get(prompt_hash(prompt))
+        if response is None:
+            raise KeyError("no recorded response for this prompt")
+        return response["message"], dict(response["usage"])
+    return lambda provider, model: generate
+
+def run_eval(generator_for, config, cases, concurrency=4):
+    """Run every case and return (results, responses) with scores attached to the results.
+
+    generator_for(provider, model) returns the generate callable for each
+    planned model, as from generator_factory(config, with_usage=True).
+    """
+    responses = {}
+    results = []
+    for case, result in zip(cases, run_jobs(recording(generator_for, responses), config, cases, concurrency)):
+        if result["message"] is not None:
+            result.update(score(result["message"], case["reference"]))
+        result["reference"] = case["reference"]
+        results.append(result)
+    return results, responses
+
+
+def _percentile(ordered, fraction):
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 4)
+
+def _mean(values):
+    return round(statistics.mean(values), 4) if values else None
+
+def summarize(results):
+    """Return the aggregate metrics of a run."""
+    ok = [r for r in results if r["message"] is not None]
+    typed = [r for r in ok if "type_match" in r]
+    latencies = sorted(r["timings"]["generate_s"] for r in ok)
+    summary = {
+        "cases": len(results),
+        "errors": len(results) - len(ok),
+        "type_accuracy": _mean([float(r["type_match"]) for r in typed]),
+        "scope_accuracy": _mean([float(r["scope_match"]) for r in typed]),
+        "subject_similarity": _mean([r["subject_similarity"] for r in ok]),
+        "input_tokens_mean": _mean([r["usage"]["input_tokens"] for r in ok]),
+        "output_tokens_mean": _mean([r["usage"]["output_tokens"] for r in ok]),
+        "tokens_estimated": any(r["usage"].get("estimated") for r in ok),
+        "latency_p50_s": _percentile(latencies, 0.5) if latencies else None,
+        "latency_p90_s": _percentile(latencies, 0.9) if latencies else None,
+        "latency_p99_s": _percentile(latencies, 0.99) if latencies else None,
+    }
+    return summary
+
+def make_report(config, results, responses):
+    return {
+        "pipeline": {
+            "provider": config.ai.provider,
+            "model": config.ai.model,
+            "structured": config.ai.structured,
+            "semantic": config.diff.semantic,
+            "exclude_generated": config.diff.exclude_generated,
+        },
+        "summary": summarize(results),
+        "results": results,
+        "responses": responses,
+    }
+
+
+# ── Baselines ───────────────────────────────────────
+
+def compare(summary, baseline):
+    """Return one {"metric", "baseline", "current", "delta", "worse"} row per shared numeric metric."""
+    rows = []
+    for metric, current in summary.items():
+        old = baseline.get(metric)
+        if isinstance(current, bool) or not isinstance(current, (int, float)) \
+                or not isinstance(old, (int, float)) or isinstance(old, bool):
+            continue
+        delta = round(current - old, 4)
+        worse = delta > 0 if metric in LOWER_IS_BETTER else delta < 0
+        rows.append({"metric": metric, "baseline": old, "current": current, "delta": delta, "worse": worse})
+    return rows
@@ -0,0 +1,131 @@
+"""
+Headless generation for CI: commit messages for many diffs at once.
+
+Jobs come from stdin or files, either as a raw unified diff per input or as
+JSONL with one {"id": ..., "diff": ...} object per line. Jobs run through a
+bounded thread pool and produce one result dict each. Nothing here reads or
+writes the git index.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from smart_commit.main import make_prompt, preprocess_diff, route_config
+from smart_commit.router import logged_generator
+from smart_commit.semantic import split_diff
+from smart_commit.tokens import check_plan, estimate_tokens, plan_request
+
+
+def _read_text(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+def parse_jobs(text, name, input_format="auto"):
+    """Return the jobs in one input as a list of {"id", "diff", ...} dicts.
+
+    With input_format "auto", text starting with "{" is read as JSONL and
+    anything else as a single diff whose id is `name`. JSONL jobs carry
+    either "diff" or "diff_file", and optionally "id", "files" and
+    "commit", the commit whose own diff it is.
+    """
+    if input_format == "diff" or (input_format == "auto" and not text.lstrip().startswith("{")):
+        return [{"id": name, "diff": text}]
+
+    jobs = []
+    for n, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"{name}:{n}: invalid JSON ({e})")
+        if not isinstance(job, dict) or ("diff" not in job and "diff_file" not in job):
+            raise ValueError(f"{name}:{n}: expected an object with 'diff' or 'diff_file'")
+        if "diff" not in job:
+            job["diff"] = _read_text(job["diff_file"])
+        job.setdefault("id", f"{name}:{n}")
+        jobs.append(job)
+    return jobs
+
+def load_jobs(inputs, stdin, input_format="auto"):
+    """Read jobs from input paths ("-" is stdin); .jsonl files are always JSONL."""
+    jobs = []
+    for path in inputs or ["-"]:
+        if path == "-":
+            jobs.extend(parse_jobs(stdin.read(), "stdin", input_format))
+        else:
+            fmt = "jsonl" if input_format == "auto" and path.endswith(".jsonl") else input_format
+            jobs.extend(parse_jobs(_read_text(path), path, fmt))
+    return jobs
+
+
+def job_prompt(config, job):
+    """Return (prompt, redaction findings) for a job's diff.
+
+    Semantic reduction only applies to jobs with a "commit", whose file
+    contents are read from that commit and its parent in the current
+    repository.
+    """
+    diff = job["diff"].strip()
+    if not diff:
+        raise ValueError("empty diff")
+    files = job.get("files") or [new or old for old, new, _ in split_diff(diff)]
+    revs = (f"{job['commit']}^", job["commit"]) if job.get("commit") else None
+    prepared, findings = preprocess_diff(config, diff, from_index=False, revs=revs)
+    return make_prompt(config, prepared, files), findings
+
+def run_job(generator_for, config, job, clock=time.monotonic):
+    """Generate the message for one job and return its result dict.
+
+    Each diff is routed with ai.routes and its prompt planned and checked
+    like a commit's, then sent to the planned model with
+    generator_for(provider, model), whose callables must
+    return (message, usage) as from generator_factory(config,
+    with_usage=True). Token counts the provider doesn't report are
+    estimated and flagged with "estimated": true. Failures are reported in
+    "error" instead of raised, so one bad job doesn't stop the rest. With
+    routes, "route" holds the tier, provider and model the job went to.
+    """
+    started = clock()
+    result = {"id": job["id"], "message": None, "error": None}
+    try:
+        config, decision = route_config(config, job["diff"])
+        prompt, findings = job_prompt(config, job)
+        plan = plan_request(config, prompt)
+        check_plan(config, plan)
+        generate = generator_for(plan["provider"], plan["model"])
+        if decision:
+            decision.update(provider=plan["provider"], model=plan["model"])
+            generate = logged_generator(generate, decision)
+            result["route"] = {key: decision[key] for key in ("tier", "provider", "model")}
+        prepared_at = clock()
+
+        message, usage = generate(prompt)
+        finished = clock()
+    except Exception as e:
+        result["error"] = str(e)
+        result["timings"] = {"total_s": round(clock() - started, 4)}
+        return result
+
+    usage = dict(usage)
+    if usage.get("input_tokens") is None or usage.get("output_tokens") is None:
+        provider, model = plan["provider"], plan["model"]
+        usage["input_tokens"] = usage.get("input_tokens") or estimate_tokens(prompt, provider, model)
+        usage["output_tokens"] = usage.get("output_tokens") or estimate_tokens(message, provider, model)
+        usage["estimated"] = True
+    result.update({
+        "message": message,
+        "redactions": len(findings),
+        "usage": usage,
+        "timings": {
+            "prepare_s": round(prepared_at - started, 4),
+            "generate_s": round(finished - prepared_at, 4),
+            "total_s": round(finished - started, 4),
+        },
+    })
+    return result
+
+def run_jobs(generator_for, config, jobs, concurrency=4):
+    """Run jobs on at most `concurrency` threads, yielding results in input order."""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        yield from pool.map(lambda job: run_job(generator_for, config, job), jobs)
@@ -1,11 +1,36 @@
+import importlib.util
+import json
 import os
 import sys
-import google.generativeai as genai
+import threading
+import time
 from dotenv import load_dotenv
 import subprocess
 from smart_commit.config_loader import load_config
+from smart_commit.cache import cache_key, get_cached_message, drop_cached_message
 import click
 
+def _lazy_import(name):
+    """Return module `name`, loaded on first attribute access, or None if it isn't installed."""
+    if name in sys.modules:
+        return sys.modules[name]
+    try:
+        spec = importlib.util.find_spec(name)
+    except ImportError:
+        return None
+    if spec is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# google-generativeai accounts for most of the startup time, so only load it
+# when Gemini is actually used. Builds without it leave genai as None.
+genai = _lazy_import("google.generativeai")
+
 # Configure stdout to use UTF-8 encoding for emoji support
 # This fixes issues on Windows terminals with cp1252 encoding
 def configure_utf8_output():
@@ -45,8 +70,38 @@ PROVIDER_DEFAULT_MODELS = {
     "openai": "gpt-4o-mini",
 }
 
-def initialize(provider: str = "google", model_name: str = "gemini-2.5-flash"):
-    """Initialize the AI provider and return a generate(prompt) -> str callable."""
+def _api_key(provider, endpoint=None):
+    env_var = (endpoint and endpoint.api_key_env) or PROVIDER_ENV_VARS[provider]
+    api_key = os.getenv(env_var)
+    if not api_key:
+        if endpoint and endpoint.base_url:
+            # Self-hosted servers usually ignore the key, but the SDKs insist on one
+            return "not-needed"
+        raise ValueError(f"{env_var} not found. Run 'smart-commit config' to set it up.")
+    return api_key
+
+def _client_kwargs(endpoint, sdk, max_retries=None):
+    """Translate an EndpointConfig into OpenAI/Anthropic client keyword arguments.
+
+    sdk is the openai or anthropic module. Its DefaultHttpxClient is only
+    needed for proxy and TLS settings, so it is looked up only then.
+    max_retries, when given, overrides the endpoint's SDK retry count.
+    """
+    if endpoint is None:
+        return {} if max_retries is None else {"max_retries": max_retries}
+    kwargs = {"timeout": endpoint.timeout, "max_retries": endpoint.max_retries}
+    if max_retries is not None:
+        kwargs["max_retries"] = max_retries
+    if endpoint.base_url:
+        kwargs["base_url"] = endpoint.base_url
+    if endpoint.headers:
+        kwargs["default_headers"] = dict(endpoint.headers)
+    if endpoint.proxy or not endpoint.verify_ssl:
+        kwargs["http_client"] = sdk.DefaultHttpxClient(proxy=endpoint.proxy, verify=endpoint.verify_ssl)
+    return kwargs
+
+def load_env():
+    """Load API keys from the app dir's .env file, or from ./.env if there is none."""
     config_dir = click.get_app_dir("smart-commit")
     env_path = os.path.join(config_dir, '.env')
     if os.path.exists(env_path):
@@ -54,41 +109,212 @@ def initialize(provider: str = "google", model_name: str = "gemini-2.5-flash"):
     else:
         load_dotenv()
 
+def _usage(input_tokens, output_tokens):
+    """Normalize provider token counts into {"input_tokens", "output_tokens"}."""
+    return {
+        "input_tokens": input_tokens if isinstance(input_tokens, int) else None,
+        "output_tokens": output_tokens if isinstance(output_tokens, int) else None,
+    }
+
+def initialize(provider: str = "google", model_name: str = "gemini-2.5-flash", endpoint=None,
+               with_usage=False, schema=None, max_tokens=None, max_retries=None):
+    """Initialize the AI provider and return a generate(prompt) -> str callable.
+
+    endpoint is an optional EndpointConfig overriding the provider's base URL,
+    headers and HTTP client settings. With with_usage=True the callable
+    returns (message, usage) instead, where usage holds the token counts
+    reported by the provider. With a JSON schema, the provider is asked for
+    structured output and the callable returns the parsed fields as a dict.
+    max_tokens caps the length of each response. Without it Anthropic and
+    OpenAI, which need a cap, get 1024 and Gemini none, since its thinking
+    tokens count against the cap. max_retries overrides how often the
+    Anthropic and OpenAI SDKs retry failed requests on their own.
+    """
+    load_env()
+
     if provider == "google":
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found. Run 'smart-commit config' to set it up.")
-        genai.configure(api_key=api_key)
+        if genai is None:
+            raise ValueError("The google provider needs the google-generativeai package. "
+                             "Install it with 'pip install google-generativeai'.")
+        api_key = _api_key("google", endpoint)
+        if endpoint:
+            # The REST transport is the one that can talk to plain-HTTP gateways
+            genai.configure(
+                api_key=api_key,
+                transport="rest",
+                client_options={"api_endpoint": endpoint.base_url} if endpoint.base_url else None,
+                default_metadata=list(endpoint.headers.items()),
+            )
+            request_options = {"timeout": endpoint.timeout}
+        else:
+            genai.configure(api_key=api_key)
+            request_options = None
         model = genai.GenerativeModel(model_name=model_name)
-        return lambda prompt: model.generate_content(prompt).text.strip()
+
+        generation_config = {"max_output_tokens": max_tokens} if max_tokens else {}
+        if schema:
+            generation_config.update(response_mime_type="application/json", response_schema=schema)
+
+        def complete(prompt):
+            response = model.generate_content(
+                prompt, generation_config=generation_config or None, request_options=request_options,
+            )
+            meta = getattr(response, "usage_metadata", None)
+            text = response.text.strip()
+            return json.loads(text) if schema else text, _usage(
+                getattr(meta, "prompt_token_count", None), getattr(meta, "candidates_token_count", None)
+            )
 
     elif provider == "anthropic":
         import anthropic as anthropic_sdk
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY not found. Run 'smart-commit config' to set it up.")
-        client = anthropic_sdk.Anthropic(api_key=api_key)
-        return lambda prompt: client.messages.create(
-            model=model_name,
-            max_tokens=1024,
-            messages=[{"role": "user", "content": prompt}],
-        ).content[0].text.strip()
+        api_key = _api_key("anthropic", endpoint)
+        client = anthropic_sdk.Anthropic(
+            api_key=api_key, **_client_kwargs(endpoint, anthropic_sdk, max_retries)
+        )
+
+        kwargs = {}
+        if schema:
+            # A forced tool call is Anthropic's way to get schema-shaped output
+            kwargs["tools"] = [{"name": "commit_message", "description": "Record the commit message.",
+                                "input_schema": schema}]
+            kwargs["tool_choice"] = {"type": "tool", "name": "commit_message"}
+
+        def complete(prompt):
+            response = client.messages.create(
+                model=model_name,
+                max_tokens=max_tokens or 1024,
+                messages=[{"role": "user", "content": prompt}],
+                **kwargs,
+            )
+            usage = getattr(response, "usage", None)
+            if schema:
+                result = next(block.input for block in response.content if block.type == "tool_use")
+            else:
+                result = response.content[0].text.strip()
+            return result, _usage(
+                getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None)
+            )
 
     elif provider == "openai":
-        from openai import OpenAI
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found. Run 'smart-commit config' to set it up.")
-        client = OpenAI(api_key=api_key)
-        return lambda prompt: client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1024,
-        ).choices[0].message.content.strip()
+        import openai as openai_sdk
+        api_key = _api_key("openai", endpoint)
+        client = openai_sdk.OpenAI(api_key=api_key, **_client_kwargs(endpoint, openai_sdk, max_retries))
+
+        kwargs = {}
+        if schema:
+            from smart_commit.structured import strict_schema
+            kwargs["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "commit_message", "strict": True,
+                                "schema": strict_schema(schema)},
+            }
+
+        def complete(prompt):
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens or 1024,
+                **kwargs,
+            )
+            usage = getattr(response, "usage", None)
+            text = response.choices[0].message.content.strip()
+            return json.loads(text) if schema else text, _usage(
+                getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+            )
 
     else:
         raise ValueError(f"Unknown provider '{provider}'. Choose: google, anthropic, openai")
-    
+
+    if with_usage:
+        return complete
+    return lambda prompt: complete(prompt)[0]
+
+def build_generator(config, provider=None, model_name=None, with_usage=False, replay=None):
+    """Initialize a provider from config, wrapped with its shared rate limits.
+
+    With record/replay enabled (ai.replay, SMART_COMMIT_REPLAY or a
+    ReplayConfig passed as replay), requests go through the replay store
+    and the provider is only initialized when a request isn't served from it.
+    """
+    provider = provider or config.ai.provider
+    model_name = model_name or config.ai.model
+    # Only a max_tokens set in config.yml caps responses; see initialize()
+    max_tokens = config.ai.max_tokens if "max_tokens" in config.ai.model_fields_set else None
+    schema = None
+    if config.ai.structured:
+        from smart_commit.structured import message_schema
+        schema = message_schema(config.commit.allowed_types)
+
+    if replay is None:
+        from smart_commit.replay import replay_settings
+        replay = replay_settings(config)
+    limits = config.ai.rate_limits.get(f"{provider}/{model_name}") or config.ai.rate_limits.get(provider)
+    # Pure replay never reaches the provider, so its quota doesn't apply
+    limits = limits if limits and not (replay and replay.mode == "replay") else None
+    # SDK retries would swallow 429s before the shared scheduler sees them
+    max_retries = 0 if limits else None
+    if replay:
+        from smart_commit.replay import replay_provider
+        generate = replay_provider(
+            replay, provider, model_name,
+            lambda: initialize(provider=provider, model_name=model_name,
+                               endpoint=config.ai.endpoints.get(provider), with_usage=True, schema=schema,
+                               max_tokens=max_tokens, max_retries=max_retries),
+            schema=schema,
+            with_usage=with_usage,
+        )
+    else:
+        generate = initialize(
+            provider=provider,
+            model_name=model_name,
+            endpoint=config.ai.endpoints.get(provider),
+            with_usage=with_usage,
+            schema=schema,
+            max_tokens=max_tokens,
+            max_retries=max_retries,
+        )
+    if schema:
+        from smart_commit.structured import structured_generator
+        generate = structured_generator(generate, config, with_usage=with_usage)
+
+    if limits:
+        from smart_commit.ratelimit import rate_limited
+        generate = rate_limited(generate, provider, model_name, limits)
+    return generate
+
+def generator_factory(config, **kwargs):
+    """Return generator_for(provider, model), which builds each model's generator once.
+
+    Used where every prompt is planned on its own and may go to
+    ai.fallback_model; kwargs are passed on to build_generator.
+    """
+    generators = {}
+    lock = threading.Lock()
+
+    def generator_for(provider, model):
+        with lock:
+            if (provider, model) not in generators:
+                generators[(provider, model)] = build_generator(
+                    config, provider=provider, model_name=model, **kwargs
+                )
+            return generators[(provider, model)]
+    return generator_for
+
+def route_config(config, diff):
+    """Apply ai.routes to diff; return (config routed to the chosen model, decision).
+
+    decision is None when no routes are configured.
+    """
+    if not config.ai.routes:
+        return config, None
+    from smart_commit.router import choose_route, diff_features, routed_config
+    decision = choose_route(config, diff_features(diff))
+    return routed_config(config, decision["provider"], decision["model"]), decision
+
+def message_key(plan, prompt):
+    """Return the response cache key of prompt, sent as planned by plan_request()."""
+    return cache_key(plan["provider"], plan["model"], prompt)
+
 def get_git_diff():
     try:
         diff = subprocess.check_output(["git", "diff", "--cached"], text=True)
@@ -112,6 +338,116 @@ def get_staged_files():
         safe_echo(f"Error getting staged files: {e}", err=True)
         return []
 
+def preprocess_diff(config, diff, from_index=True, repo=None, revs=None):
+    """Apply the configured pre-processing to a diff and return (diff, redaction findings).
+
+    repo is the repository the diff was staged in, by default the current
+    directory. Semantic reduction reads file contents from its HEAD and
+    index, or from the (base, new) revisions in revs for a diff between two
+    commits, so it is skipped for other diffs that don't come from an index.
+    """
+    findings = []
+    if config.diff.exclude_generated:
+        from smart_commit.classify import filter_diff
+        diff = filter_diff(diff, config.diff.exclude_globs, repo=repo)
+    if config.diff.semantic and (from_index or revs):
+        from smart_commit.semantic import reduce_diff
+        base, new = revs or ("HEAD", "")
+        diff = reduce_diff(diff, max_hunk_lines=config.diff.semantic_hunk_lines, base=base, new=new, repo=repo)
+    if config.diff.redact_secrets:
+        from smart_commit.redact import redact
+        diff, findings = redact(diff, pii=config.diff.redact_pii)
+    return diff, findings
+
+def redaction_notice(findings):
+    """Describe redaction findings for the user, e.g. 'Redacted 1 jwt from the diff (lines 4)'."""
+    from smart_commit.redact import summarize_findings
+    lines = ", ".join(str(f["line"]) for f in findings[:10])
+    if len(findings) > 10:
+        lines += ", ..."
+    return f"Redacted {summarize_findings(findings)} from the diff (lines {lines})"
+
+def prepare_diff(config, diff, revs=None):
+    """Apply the configured pre-processing to a staged diff before prompting.
+
+    revs is the (base, new) pair of a snapshot's diff; see preprocess_diff().
+    """
+    diff, findings = preprocess_diff(config, diff, revs=revs)
+    if findings:
+        safe_echo(f"🔒 {redaction_notice(findings)}", err=True)
+    return diff
+
+def build_prompt(diff, staged_files, rules):
+    """Build the commit message prompt for a staged diff."""
+    rules = "\n".join(rules)
+
+    return f"""
+You are an expert at generating Git commit messages that follow the Conventional Commits specification.
+
+**1. Format**
+Your output must be only the commit message, in this exact format:
+<emoji> type(scope): subject
+
+[optional body: explains the "what" and "why" of the change]
+
+[optional footer: e.g., "BREAKING CHANGE: description"]
+
+**2. Commit Types & Emojis**
+Use exactly one of the following types, with its corresponding emoji:
+- ✨ `feat`: A new feature for the user.
+- 🐛 `fix`: A bug fix for the user.
+- 📚 `docs`: Documentation changes only.
+- 🎨 `style`: Code style changes (formatting, whitespace, etc; no logic change).
+- ♻️ `refactor`: A code change that neither fixes a bug nor adds a feature.
+- ⚡ `perf`: A code change that improves performance.
+- 🧪 `test`: Adding missing tests or correcting existing tests.
+- 🏗️ `build`: Changes that affect the build system or external dependencies.
+- 👷 `ci`: Changes to our CI configuration files and scripts.
+- 🔧 `chore`: Other changes that don't modify src or test files (routine maintenance).
+- ⏪ `revert`: Reverts a previous commit.
+
+**3. Guidelines**
+- Subject line must be under 72 characters and use present tense (e.g., "add," not "added").
+- The `scope` should be a noun identifying the part of the codebase affected (e.g., `api`, `auth`, `ui`).
+- **A body is required if:** the change is complex, affects multiple areas, or introduces a breaking change. Use bullet points in the body to explain key changes.
+- **A `BREAKING CHANGE:` footer is required if** the change is not backward-compatible.
+
+**4. Examples**
+[EXAMPLE 1: Simple fix]
+- ✨ feat(auth): add Google OAuth integration
+
+[EXAMPLE 2: Complex refactor with a body]
+- ♻️ refactor(api): restructure user authentication flow
+  
+  Extract OAuth logic into a separate service and add proper error
+  handling for expired tokens. This improves modularity and testability.
+
+[EXAMPLE 3: Feature with a breaking change]
+- ✨ feat(api): implement v2 user management system
+  
+  Complete rewrite of user handling with a new database schema.
+  
+  BREAKING CHANGE: The `/api/user` endpoint now returns a different
+  response format and requires an API key for authentication.
+
+**5. Your Task**
+Analyze the following files and diff, then generate the complete commit message.
+{rules}
+- **Files Changed:** {", ".join(staged_files)}
+- **Diff:**
+```diff
+{diff}
+
+Files changed: {", ".join(staged_files)}
+"""
+
+def make_prompt(config, diff, staged_files):
+    """Build the prompt for a prepared diff in the configured generation mode."""
+    if config.ai.structured:
+        from smart_commit.structured import build_structured_prompt
+        return build_structured_prompt(diff, staged_files, config.ai.rules, config.commit.allowed_types)
+    return build_prompt(diff, staged_files, config.ai.rules)
+
 @click.group()
 def cli():
     """Smart Commit: AI-powered commit message generator"""
@@ -237,90 +573,479 @@ def status():
 
 @cli.command()
 @click.option('--no-confirm', is_flag=True, help="Skip confirmation prompt")
-def commit(no_confirm):
+@click.option('--no-cache', is_flag=True, help="Ignore messages pre-generated by 'smart-commit watch'")
+@click.option('--repos', 'repo_globs', multiple=True,
+              help="Commit every repository matching this glob (repeatable)")
+@click.option('--recurse-submodules', is_flag=True, help="Also commit staged changes in submodules")
+@click.option('--trailer', is_flag=True,
+              help="With several repositories, add a shared Change-Set trailer to each commit")
+@click.option('--concurrency', '-j', default=4, show_default=True, type=click.IntRange(min=1),
+              help="Repositories processed in parallel")
+@click.option('--dry-run', is_flag=True, help="Print the prompt size and cost estimate without generating")
+@click.option('--snapshot/--no-snapshot', default=None,
+              help="Commit a snapshot of the index taken before generating [default: git.snapshot]")
+def commit(no_confirm, no_cache, repo_globs, recurse_submodules, trailer, concurrency, dry_run, snapshot):
     """Generate and make a commit"""
+    if repo_globs or recurse_submodules:
+        commit_repos(repo_globs, recurse_submodules, no_confirm, no_cache, trailer, concurrency, snapshot,
+                     dry_run=dry_run)
+        return
+
     try:
+        from smart_commit.tokens import check_plan, format_plan, plan_request
         config = load_config()
-        generate = initialize(provider=config.ai.provider, model_name=config.ai.model)
 
-        diff = get_git_diff()
+        snap = None
+        if config.git.snapshot if snapshot is None else snapshot:
+            from smart_commit.snapshot import snapshot_diff, snapshot_files, snapshot_revs, take_snapshot
+            snap = take_snapshot()
+            diff = snapshot_diff(snap)
+        else:
+            diff = get_git_diff()
         if not diff:
             safe_echo("No staged changes found. Stage your files with 'git add' first.")
             sys.exit(1)
 
-        staged_files = get_staged_files()
-        rules = "\n".join(config.ai.rules)
+        config, decision = route_config(config, diff)
+        if decision:
+            from smart_commit.router import describe
+            safe_echo(f"🧭 {describe(decision)}")
 
-        prompt = f"""
-You are an expert at generating Git commit messages that follow the Conventional Commits specification.
+        staged_files = snapshot_files(snap) if snap else get_staged_files()
+        # A snapshot's blobs are read from its trees, not the live index
+        revs = snapshot_revs(snap) if snap else None
+        prompt = make_prompt(config, prepare_diff(config, diff, revs), staged_files)
 
-**1. Format**
-Your output must be only the commit message, in this exact format:
-<emoji> type(scope): subject
+        plan = plan_request(config, prompt)
+        if dry_run:
+            safe_echo(f"📏 {format_plan(plan)}")
+            check_plan(config, plan)
+            return
 
-[optional body: explains the "what" and "why" of the change]
+        key = message_key(plan, prompt)
+        commit_message = None
+        if config.ai.cache and not no_cache:
+            commit_message = get_cached_message(key, max_age=config.ai.cache_ttl)
+        if commit_message:
+            safe_echo("⚡ Using pre-generated message from 'smart-commit watch'")
+        else:
+            check_plan(config, plan)
+            if plan["fallback"]:
+                safe_echo(f"📏 Large prompt, using {plan['provider']}/{plan['model']}")
+            generate = build_generator(config, provider=plan["provider"], model_name=plan["model"])
+            if decision:
+                from smart_commit.router import logged_generator
+                decision.update(provider=plan["provider"], model=plan["model"])
+                generate = logged_generator(generate, decision)
+            commit_message = generate(prompt)
+        safe_echo(f"\nGenerated commit message:\n{commit_message}\n")
 
-[optional footer: e.g., "BREAKING CHANGE: description"]
+        if no_confirm or click.confirm("Do you want to commit with this message?"):
+            if snap:
+                from smart_commit.snapshot import commit_snapshot
+                commit_snapshot(snap, commit_message)
+                safe_echo("Successfully committed!")
+            else:
+                commit_with_message(commit_message)
+        else:
+            drop_cached_message(key)
+            safe_echo("Commit aborted.")
 
-**2. Commit Types & Emojis**
-Use exactly one of the following types, with its corresponding emoji:
-- ✨ `feat`: A new feature for the user.
-- 🐛 `fix`: A bug fix for the user.
-- 📚 `docs`: Documentation changes only.
-- 🎨 `style`: Code style changes (formatting, whitespace, etc; no logic change).
-- ♻️ `refactor`: A code change that neither fixes a bug nor adds a feature.
-- ⚡ `perf`: A code change that improves performance.
-- 🧪 `test`: Adding missing tests or correcting existing tests.
-- 🏗️ `build`: Changes that affect the build system or external dependencies.
-- 👷 `ci`: Changes to our CI configuration files and scripts.
-- 🔧 `chore`: Other changes that don't modify src or test files (routine maintenance).
-- ⏪ `revert`: Reverts a previous commit.
+    except Exception as e:
+        safe_echo(f"Error: {e}", err=True)
+        sys.exit(1)
 
-**3. Guidelines**
-- Subject line must be under 72 characters and use present tense (e.g., "add," not "added").
-- The `scope` should be a noun identifying the part of the codebase affected (e.g., `api`, `auth`, `ui`).
-- **A body is required if:** the change is complex, affects multiple areas, or introduces a breaking change. Use bullet points in the body to explain key changes.
-- **A `BREAKING CHANGE:` footer is required if** the change is not backward-compatible.
+def commit_repos(repo_globs, recurse_submodules, no_confirm, no_cache, trailer, concurrency, snapshot=None,
+                 dry_run=False):
+    """Generate, review and make commits in several repositories at once."""
+    from smart_commit.multirepo import (
+        add_trailer, change_set_trailer, commit_repo, commit_rounds, find_repos, generate_all, prepare_repo,
+        repo_label, repo_root, stage_gitlink, submodule_repos, superproject,
+    )
+    from smart_commit.router import describe
+    from smart_commit.tokens import check_plan, format_plan
 
-**4. Examples**
-[EXAMPLE 1: Simple fix]
-- ✨ feat(auth): add Google OAuth integration
+    try:
+        config = load_config()
+        if snapshot is not None:
+            config = config.model_copy(update={"git": config.git.model_copy(update={"snapshot": snapshot})})
+        roots = find_repos(repo_globs) if repo_globs else [repo_root(".")]
+        repos = []
+        for root in filter(None, roots):
+            for repo in (submodule_repos(root) if recurse_submodules else []) + [root]:
+                if repo not in repos:
+                    repos.append(repo)
+        if not repos:
+            safe_echo("No git repositories found.")
+            sys.exit(1)
 
-[EXAMPLE 2: Complex refactor with a body]
-- ♻️ refactor(api): restructure user authentication flow
-  
-  Extract OAuth logic into a separate service and add proper error
-  handling for expired tokens. This improves modularity and testability.
+        if dry_run:
+            over = 0
+            for repo in repos:
+                change = prepare_repo(config, repo, use_cache=False)
+                if change is None:
+                    continue
+                safe_echo(f"── {repo_label(repo)} ──")
+                if change["decision"]:
+                    safe_echo(f"🧭 {describe(change['decision'])}")
+                safe_echo(f"📏 {format_plan(change['plan'])}")
+                try:
+                    check_plan(config, change["plan"])
+                except ValueError as e:
+                    over += 1
+                    safe_echo(f"Error ({repo_label(repo)}): {e}", err=True)
+            if over:
+                sys.exit(1)
+            return
 
-[EXAMPLE 3: Feature with a breaking change]
-- ✨ feat(api): implement v2 user management system
-  
-  Complete rewrite of user handling with a new database schema.
-  
-  BREAKING CHANGE: The `/api/user` endpoint now returns a different
-  response format and requires an API key for authentication.
+        generator_for = generator_factory(config)
+        # Superprojects wait for their submodules' commits, whose gitlinks they then stage
+        rounds = commit_rounds(repos) if recurse_submodules else [repos]
+        shared = None
+        committed = 0
+        for n, round_repos in enumerate(rounds):
+            safe_echo(f"🔎 Generating messages for staged changes in {len(round_repos)} repositories...")
+            changes, empty = generate_all(generator_for, config, round_repos,
+                                          concurrency=concurrency, use_cache=not no_cache)
+            if empty:
+                safe_echo(f"Nothing staged in: {', '.join(repo_label(repo) for repo in empty)}")
+            if not changes:
+                continue
 
-**5. Your Task**
-Analyze the following files and diff, then generate the complete commit message.
-{rules}
-- **Files Changed:** {", ".join(staged_files)}
-- **Diff:**
-```diff
-{diff}
+            failed = [change for change in changes if change["error"]]
+            for change in failed:
+                safe_echo(f"Error ({repo_label(change['repo'])}): {change['error']}", err=True)
+            if failed:
+                sys.exit(1)
 
-Files changed: {", ".join(staged_files)}
-"""
-        commit_message = generate(prompt)
-        safe_echo(f"\nGenerated commit message:\n{commit_message}\n")
+            later = [repo for next_round in rounds[n + 1:] for repo in next_round]
+            if trailer and shared is None and len(changes) + len(later) > 1:
+                shared = change_set_trailer([change["repo"] for change in changes] + later)
+            if shared:
+                for change in changes:
+                    change["message"] = add_trailer(change["message"], shared)
 
-        if no_confirm or click.confirm("Do you want to commit with this message?"):
-            commit_with_message(commit_message)
+            for change in changes:
+                safe_echo(f"\n── {repo_label(change['repo'])} ──")
+                if change.get("decision"):
+                    safe_echo(f"🧭 {describe(change['decision'])}")
+                if change["notice"]:
+                    safe_echo(f"🔒 {change['notice']}", err=True)
+                if change["cached"]:
+                    safe_echo("⚡ Using pre-generated message from 'smart-commit watch'")
+                safe_echo(change["message"])
+            safe_echo("")
+
+            if not (no_confirm or click.confirm(f"Commit {len(changes)} repositories with these messages?")):
+                for change in changes:
+                    drop_cached_message(change["key"])
+                safe_echo("Commit aborted.")
+                return
+
+            errors = 0
+            for change in changes:
+                ok, output = commit_repo(change["repo"], change["message"], change.get("snapshot"))
+                if not ok:
+                    errors += 1
+                    safe_echo(f"❌ Git commit failed in {repo_label(change['repo'])}: {output}", err=True)
+                    continue
+                committed += 1
+                safe_echo(f"✅ Committed {repo_label(change['repo'])}")
+                parent = superproject(change["repo"]) if recurse_submodules else None
+                if parent in repos:
+                    ok, output = stage_gitlink(change["repo"], parent)
+                    if not ok:
+                        errors += 1
+                        safe_echo(f"❌ Could not stage {repo_label(change['repo'])} in "
+                                  f"{repo_label(parent)}: {output}", err=True)
+            if errors:
+                sys.exit(1)
+
+        if not committed:
+            safe_echo("No staged changes found. Stage your files with 'git add' first.")
+            sys.exit(1)
+
+    except Exception as e:
+        safe_echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+@cli.command()
+@click.option('--interval', default=0.5, show_default=True, help="Seconds between index checks")
+@click.option('--debounce', default=1.0, show_default=True, help="Seconds the index must stay unchanged before generating")
+def watch(interval, debounce):
+    """Pre-generate commit messages in the background as you stage changes"""
+    from smart_commit.watch import SpeculativeGenerator, watch_index
+
+    try:
+        config = load_config()
+        if not config.ai.cache:
+            safe_echo("Error: watch stores messages in the response cache, but ai.cache is off.", err=True)
+            sys.exit(1)
+        speculator = SpeculativeGenerator(generator_factory(config), config)
+
+        safe_echo("👀 Watching the git index for staged changes (Ctrl+C to stop)")
+        watch_index(
+            on_change=speculator.cancel,
+            on_settled=speculator.schedule,
+            interval=interval,
+            debounce=debounce,
+        )
+    except KeyboardInterrupt:
+        safe_echo("\nStopped watching.")
+    except Exception as e:
+        safe_echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+@cli.command("route-stats")
+@click.option('--days', type=click.FloatRange(min=0, min_open=True), default=None,
+              help="Only decisions from the last N days")
+@click.option('--json', 'as_json', is_flag=True, help="Print one JSON summary per line")
+def route_stats_command(days, as_json):
+    """Summarize model routing decisions and latencies"""
+    from smart_commit.router import log_path, read_log, route_stats
+
+    records = read_log(since=time.time() - days * 86400 if days else None)
+    if not records:
+        safe_echo(f"No routing decisions logged yet ({log_path()}).")
+        return
+    stats = route_stats(records)
+    if as_json:
+        for row in stats:
+            click.echo(json.dumps(row))
+        return
+    safe_echo(f"{'tier':<8} {'model':<36} {'reqs':>5} {'errs':>5} {'lines p50':>9} {'max':>6} "
+              f"{'p50 s':>7} {'p90 s':>7}")
+    for row in stats:
+        tier = "default" if row["tier"] is None else str(row["tier"])
+        p50 = "-" if row["latency_p50_s"] is None else f"{row['latency_p50_s']:.2f}"
+        p90 = "-" if row["latency_p90_s"] is None else f"{row['latency_p90_s']:.2f}"
+        safe_echo(f"{tier:<8} {row['model']:<36} {row['requests']:>5} {row['errors']:>5} "
+                  f"{row['lines_median']:>9} {row['lines_max']:>6} {p50:>7} {p90:>7}")
+
+@cli.command("generate")
+@click.argument('inputs', nargs=-1, type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--json', 'as_json', is_flag=True, help="Print one JSON result per line")
+@click.option('--input-format', default="auto", show_default=True,
+              type=click.Choice(["auto", "diff", "jsonl"]),
+              help="Read inputs as raw diffs or JSONL jobs (auto: JSONL if it starts with '{')")
+@click.option('--concurrency', '-j', default=4, show_default=True, type=click.IntRange(min=1),
+              help="Number of jobs generated in parallel")
+def generate_command(inputs, as_json, input_format, concurrency):
+    """Generate messages for diffs from stdin or files, without touching git"""
+    from smart_commit.headless import load_jobs, run_jobs
+
+    try:
+        config = load_config()
+        jobs = load_jobs(inputs, sys.stdin, input_format)
+        generator_for = generator_factory(config, with_usage=True)
+    except Exception as e:
+        safe_echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    failed = 0
+    for result in run_jobs(generator_for, config, jobs, concurrency=concurrency):
+        if result["error"]:
+            failed += 1
+        if as_json:
+            click.echo(json.dumps(result))
+        elif result["error"]:
+            safe_echo(f"Error ({result['id']}): {result['error']}", err=True)
         else:
-            safe_echo("Commit aborted.")
+            safe_echo(f"── {result['id']} ──\n{result['message']}\n")
+    if failed:
+        sys.exit(1)
+
+@cli.group()
+def batch():
+    """Generate messages in bulk through provider batch APIs"""
+    pass
+
+def _format_counts(counts):
+    order = ["pending", "submitted", "done", "failed"]
+    return ", ".join(f"{counts[s]} {s}" for s in order if counts.get(s)) or "no jobs"
+
+def _run_backend(run_id):
+    from smart_commit.batch import batch_backend, get_run
+
+    run = get_run(run_id)
+    config = load_config()
+    return batch_backend(run["provider"], run["model"], config.ai.endpoints.get(run["provider"]),
+                         max_tokens=config.ai.max_tokens)
+
+@batch.command("submit")
+@click.argument('rev_range', required=False, default="HEAD")
+@click.option('--jobs', 'jobs_file', type=click.Path(exists=True, dir_okay=False, allow_dash=True),
+              help="Read JSONL jobs (as for 'generate') instead of commits")
+@click.option('--max-count', '-n', type=click.IntRange(min=1), help="Only the latest N commits")
+@click.option('--run', 'run_id', help="Resume submitting an existing run")
+@click.option('--batch-size', default=10000, show_default=True, type=click.IntRange(min=1),
+              help="Maximum requests per provider batch")
+def batch_submit(rev_range, jobs_file, max_count, run_id, batch_size):
+    """Submit one job per commit in REV_RANGE (default: HEAD)"""
+    from smart_commit.batch import batch_backend, commit_jobs, create_run, submit_run
+
+    try:
+        if run_id:
+            backend = _run_backend(run_id)
+        else:
+            config = load_config()
+            backend = batch_backend(config.ai.provider, config.ai.model,
+                                    config.ai.endpoints.get(config.ai.provider),
+                                    max_tokens=config.ai.max_tokens)
+            if jobs_file:
+                from smart_commit.headless import load_jobs
+                jobs = load_jobs([jobs_file], sys.stdin, "jsonl")
+            else:
+                jobs = commit_jobs(rev_range, max_count=max_count)
+            if not jobs:
+                safe_echo("Nothing to submit.")
+                sys.exit(1)
+            run_id = create_run(config, jobs)
+            safe_echo(f"📋 Created run {run_id} with {len(jobs)} jobs")
+
+        try:
+            batch_ids = submit_run(run_id, backend, batch_size=batch_size)
+        except Exception as e:
+            safe_echo(f"Error: {e}", err=True)
+            safe_echo(f"Retry with 'smart-commit batch submit --run {run_id}'", err=True)
+            sys.exit(1)
+        safe_echo(f"📦 Submitted {len(batch_ids)} batch(es) for run {run_id}")
+        safe_echo(f"   Check progress with 'smart-commit batch status {run_id}'")
+    except Exception as e:
+        safe_echo(f"Error: {e}", err=True)
+        sys.exit(1)
 
+@batch.command("status")
+@click.argument('run_id')
+def batch_status(run_id):
+    """Poll a run's batches once and show its progress"""
+    from smart_commit.batch import poll_run
+
+    try:
+        counts = poll_run(run_id, _run_backend(run_id))
+    except Exception as e:
+        safe_echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    safe_echo(f"Run {run_id}: {_format_counts(counts)}")
+
+@batch.command("collect")
+@click.argument('run_id')
+@click.option('--wait', is_flag=True, help="Poll until every batch has finished")
+@click.option('--interval', default=60.0, show_default=True, help="Seconds between polls with --wait")
+@click.option('--json', 'as_json', is_flag=True, help="Print one JSON result per line")
+def batch_collect(run_id, wait, interval, as_json):
+    """Print the messages of a run's finished jobs"""
+    from smart_commit.batch import poll_run, run_results, wait_for_run
+
+    try:
+        backend = _run_backend(run_id)
+        counts = wait_for_run(run_id, backend, interval=interval) if wait else poll_run(run_id, backend)
+        results = run_results(run_id)
+    except Exception as e:
+        safe_echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    for result in results:
+        if result["status"] not in ("done", "failed"):
+            continue
+        if as_json:
+            click.echo(json.dumps(result))
+        elif result["error"]:
+            safe_echo(f"Error ({result['id']}): {result['error']}", err=True)
+        else:
+            safe_echo(f"── {result['id']} ──\n{result['message']}\n")
+    if counts.get("submitted") or counts.get("pending"):
+        safe_echo(f"⏳ Run {run_id} is not finished: {_format_counts(counts)}", err=True)
+
+@batch.command("list")
+def batch_list():
+    """List batch runs"""
+    from smart_commit.batch import list_runs
+
+    for run in list_runs():
+        safe_echo(f"{run['run_id']}  {run['provider']}/{run['model']}  {_format_counts(run['counts'])}")
+
+@cli.group("eval")
+def eval_group():
+    """Measure message quality and latency against a corpus"""
+
+@eval_group.command("corpus")
+@click.argument('rev_range', required=False, default="HEAD")
+@click.option('--max-count', '-n', default=200, show_default=True, type=click.IntRange(min=1),
+              help="Latest N commits to include")
+@click.option('-o', '--output', type=click.File("w", encoding="utf-8"), default="-",
+              help="Corpus file to write (default: stdout)")
+def eval_corpus(rev_range, max_count, output):
+    """Extract (diff, message) cases from the history in REV_RANGE"""
+    from smart_commit.evaluate import build_corpus, write_corpus
+
+    try:
+        cases = build_corpus(rev_range, max_count)
     except Exception as e:
         safe_echo(f"Error: {e}", err=True)
         sys.exit(1)
+    write_corpus(cases, output)
+    safe_echo(f"📚 {len(cases)} cases from {rev_range}", err=True)
+
+@eval_group.command("run")
+@click.argument('corpus', type=click.Path(exists=True, dir_okay=False))
+@click.option('--limit', type=click.IntRange(min=1), help="Only the first N cases")
+@click.option('--concurrency', '-j', default=4, show_default=True, type=click.IntRange(min=1),
+              help="Cases generated in parallel")
+@click.option('-o', '--output', type=click.Path(dir_okay=False), help="Write the JSON report to this file")
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help="Earlier report to compare the metrics against")
+@click.option('--replay', type=click.Path(exists=True, dir_okay=False),
+              help="Serve responses recorded in an earlier report instead of calling the provider")
+@click.option('--record', 'record_store', type=click.Path(dir_okay=False),
+              help="Also record every provider response into this replay store")
+@click.option('--replay-store', type=click.Path(exists=True, dir_okay=False),
+              help="Serve responses from a replay store offline, with their recorded latencies")
+def eval_run(corpus, limit, concurrency, output, baseline, replay, record_store, replay_store):
+    """Generate messages for a corpus and score them against the references"""
+    from smart_commit.config_loader import ReplayConfig
+    from smart_commit.evaluate import compare, load_corpus, make_report, replaying, run_eval
+
+    try:
+        config = load_config()
+        cases = load_corpus(corpus, limit)
+        if replay:
+            with open(replay, encoding="utf-8") as f:
+                generator_for = replaying(json.load(f)["responses"])
+        elif replay_store:
+            generator_for = generator_factory(
+                config, with_usage=True, replay=ReplayConfig(mode="replay", path=replay_store, latency="recorded"),
+            )
+        elif record_store:
+            generator_for = generator_factory(
+                config, with_usage=True, replay=ReplayConfig(mode="record", path=record_store),
+            )
+        else:
+            generator_for = generator_factory(config, with_usage=True)
+    except Exception as e:
+        safe_echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    results, responses = run_eval(generator_for, config, cases, concurrency)
+    report = make_report(config, results, responses)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    summary = report["summary"]
+    safe_echo(f"📊 {summary['cases']} cases, {summary['errors']} errors")
+    for metric, value in summary.items():
+        if metric not in ("cases", "errors"):
+            safe_echo(f"  {metric:<20} {value}")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            rows = compare(summary, json.load(f)["summary"])
+        safe_echo("\nAgainst baseline:")
+        for row in rows:
+            mark = " ⚠️ worse" if row["worse"] else ""
+            safe_echo(f"  {row['metric']:<20} {row['baseline']} -> {row['current']} ({row['delta']:+}){mark}")
 
 def main():
     cli()
@@ -0,0 +1,196 @@
+"""
+Tiny mock inference server speaking the OpenAI, Anthropic and Gemini REST APIs.
+
+Used by the tests and for load testing without real API calls:
+
+    python -m smart_commit.mock_server --port 8089 --latency 0.2
+
+then point a provider at it in config.yml:
+
+    ai:
+      provider: "openai"
+      endpoints:
+        openai:
+          base_url: "http://127.0.0.1:8089/v1"
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+DEFAULT_MESSAGE = "✨ feat(mock): add generated change"
+
+_GEMINI_PATH = re.compile(r"^/v1(?:beta)?/models/(?P<model>[^/:]+):(?P<method>generateContent|countTokens)$")
+_HEADER = re.compile(r"^(?:\S+\s+)?(?P<type>\w+)(?:\((?P<scope>[^)]*)\))?(?P<breaking>!)?:\s*(?P<subject>.*)$")
+
+
+def _usage(prompt, message):
+    # Rough 4-chars-per-token estimate; good enough for a mock
+    return max(1, len(prompt) // 4), max(1, len(message) // 4)
+
+def _fields(message):
+    # Structured-output replies carry the canned message split into its fields
+    header, _, body = message.partition("\n\n")
+    match = _HEADER.match(header.strip())
+    if not match:
+        return {"type": "chore", "scope": "", "subject": header.strip(), "body": body.strip(), "breaking": False}
+    return {
+        "type": match["type"],
+        "scope": match["scope"] or "",
+        "subject": match["subject"],
+        "body": body.strip(),
+        "breaking": bool(match["breaking"]),
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "SmartCommitMock/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": {"message": "invalid JSON"}})
+            return
+
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        self.server.requests.append({"path": path, "headers": headers, "body": request})
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        message = self.server.message
+        gemini = _GEMINI_PATH.match(path)
+        if path.endswith("/responses/input_tokens"):
+            tokens, _ = _usage(str(request.get("input", "")), "")
+            self._reply(200, {"object": "response.input_tokens", "input_tokens": tokens})
+        elif path.endswith("/messages/count_tokens"):
+            prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+            self._reply(200, {"input_tokens": _usage(prompt, "")[0]})
+        elif gemini and gemini["method"] == "countTokens":
+            # The SDK wraps the contents in a generateContentRequest
+            counted = request.get("generateContentRequest", request)
+            prompt = " ".join(
+                part.get("text", "")
+                for content in counted.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            self._reply(200, {"totalTokens": _usage(prompt, "")[0]})
+        elif path.endswith("/chat/completions"):
+            prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+            if request.get("response_format", {}).get("type") == "json_schema":
+                message = json.dumps(_fields(message))
+            prompt_tokens, completion_tokens = _usage(prompt, message)
+            self._reply(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": message},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+        elif path.endswith("/messages"):
+            prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+            input_tokens, output_tokens = _usage(prompt, message)
+            tools = request.get("tools")
+            if tools:
+                content = [{"type": "tool_use", "id": "toolu_mock", "name": tools[0]["name"],
+                            "input": _fields(message)}]
+            else:
+                content = [{"type": "text", "text": message}]
+            self._reply(200, {
+                "id": "msg_mock",
+                "type": "message",
+                "role": "assistant",
+                "model": request.get("model", "mock"),
+                "content": content,
+                "stop_reason": "tool_use" if tools else "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+            })
+        elif gemini:
+            prompt = " ".join(
+                part.get("text", "")
+                for content in request.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            if "responseSchema" in request.get("generationConfig", {}):
+                message = json.dumps(_fields(message))
+            prompt_tokens, candidates_tokens = _usage(prompt, message)
+            self._reply(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": message}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": candidates_tokens,
+                    "totalTokenCount": prompt_tokens + candidates_tokens,
+                },
+            })
+        else:
+            self._reply(404, {"error": {"message": f"unknown endpoint {path}"}})
+
+
+def start_mock_server(host="127.0.0.1", port=0, latency=0.0, message=DEFAULT_MESSAGE, verbose=False):
+    """Start the mock server on a background thread and return it.
+
+    The server's base URL is available as `server.url`; received requests are
+    recorded in `server.requests`. Call `server.shutdown()` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.message = message
+    server.verbose = verbose
+    server.requests = []
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8089, show_default=True)
+@click.option("--latency", default=0.0, show_default=True, help="Seconds to wait before each response")
+@click.option("--message", default=DEFAULT_MESSAGE, show_default=True, help="Commit message to return")
+def serve(host, port, latency, message):
+    """Run a mock OpenAI/Anthropic/Gemini-compatible server"""
+    server = start_mock_server(host, port, latency, message, verbose=True)
+    click.echo(f"Mock server listening on {server.url}")
+    click.echo(f"  openai:    base_url: \"{server.url}/v1\"")
+    click.echo(f"  anthropic: base_url: \"{server.url}\"")
+    click.echo(f"  google:    base_url: \"{server.url}\"")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,203 @@
+"""
+Commit coordinated changes across several repositories at once.
+
+Repositories come from glob patterns (`commit --repos 'services/*'`) or from
+the current repository's submodules. Staged diffs are read and messages
+generated concurrently with one shared provider client, then every repo is
+shown for a single review and committed in turn. Submodules go in an
+earlier round than the repositories containing them, whose new gitlinks
+are staged before their own messages are generated. All git calls use
+`git -C <repo>`, so the current directory is never changed.
+"""
+import glob
+import os
+import subprocess
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from smart_commit.cache import get_cached_message
+from smart_commit.main import make_prompt, message_key, preprocess_diff, redaction_notice, route_config
+from smart_commit.router import logged_generator
+from smart_commit.snapshot import commit_snapshot, snapshot_diff, snapshot_files, snapshot_revs, take_snapshot
+from smart_commit.tokens import check_plan, plan_request
+
+TRAILER_KEY = "Change-Set"
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-C", repo, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+
+
+def repo_root(path):
+    """Return the top level of the work tree containing path, or None if it isn't in one."""
+    result = _git(path, "rev-parse", "--show-toplevel")
+    if result.returncode != 0:
+        return None
+    return os.path.normpath(result.stdout.strip())
+
+def find_repos(patterns):
+    """Return the distinct repositories matched by glob patterns, in pattern order.
+
+    Only matches that are the top level of a work tree count; a plain
+    directory inside a repository is not that repository.
+    """
+    repos = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.expanduser(pattern), recursive=True)):
+            if not os.path.isdir(path):
+                continue
+            root = repo_root(path)
+            # --show-toplevel resolves symlinks, so compare real paths
+            if root and os.path.realpath(root) == os.path.realpath(path) and root not in repos:
+                repos.append(root)
+    return repos
+
+def repo_label(repo):
+    """Return a short name for repo: its path relative to the current directory."""
+    rel = os.path.relpath(repo)
+    return os.path.basename(repo) if rel == "." else rel
+
+def submodule_repos(root="."):
+    """Return the initialized submodules of root, recursively, deepest first."""
+    # foreach only visits checked-out submodules; paths are NUL-separated as they may hold spaces
+    script = 'printf "%s/%s\\0" "$toplevel" "$sm_path"'
+    result = _git(root, "submodule", "--quiet", "foreach", "--recursive", script)
+    if result.returncode != 0:
+        return []
+    paths = [os.path.normpath(path) for path in result.stdout.split("\0") if path]
+    # Commit nested submodules before the repositories that contain them
+    return sorted(paths, key=lambda p: p.count(os.sep), reverse=True)
+
+
+def superproject(repo):
+    """Return the work tree of the repository repo is a submodule of, or None."""
+    result = _git(repo, "rev-parse", "--show-superproject-working-tree")
+    path = result.stdout.strip()
+    return os.path.normpath(path) if result.returncode == 0 and path else None
+
+def commit_rounds(repos):
+    """Split repos into rounds, in order, where each repo comes after its submodules among repos."""
+    parents = {repo: superproject(repo) for repo in repos}
+    rounds = []
+    pending = list(repos)
+    while pending:
+        waiting = {parents[repo] for repo in pending}
+        rounds.append([repo for repo in pending if repo not in waiting])
+        pending = [repo for repo in pending if repo in waiting]
+    return rounds
+
+def stage_gitlink(repo, parent):
+    """Stage repo's current commit as its gitlink in parent; return (ok, git output)."""
+    result = _git(parent, "add", "--", os.path.relpath(repo, parent))
+    return result.returncode == 0, (result.stdout + result.stderr).strip()
+
+
+def staged_diff(repo):
+    """Return the staged diff of repo, stripped."""
+    result = _git(repo, "diff", "--cached")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"git diff failed in {repo}")
+    return result.stdout.strip()
+
+def staged_files(repo):
+    """Return the paths staged in repo."""
+    return _git(repo, "diff", "--cached", "--name-only").stdout.splitlines()
+
+def commit_repo(repo, message, snapshot=None):
+    """Commit repo's index, or a snapshot of it, with message; return (ok, git output)."""
+    if snapshot:
+        try:
+            return True, commit_snapshot(snapshot, message, repo=repo)
+        except RuntimeError as e:
+            return False, str(e)
+    result = _git(repo, "commit", "-m", message)
+    return result.returncode == 0, (result.stdout + result.stderr).strip()
+
+
+def add_trailer(message, trailer):
+    """Append a git trailer line to message, in the trailer block if it has one."""
+    lines = message.rstrip().splitlines()
+    last = lines[-1] if lines else ""
+    in_trailers = len(lines) > 1 and ": " in last and not last.startswith((" ", "-", "*"))
+    separator = "\n" if in_trailers else "\n\n"
+    return message.rstrip() + separator + trailer
+
+def change_set_trailer(repos):
+    """Return a trailer tying together the commits made in one multi-repo run."""
+    names = ", ".join(os.path.basename(repo) for repo in repos)
+    return f"{TRAILER_KEY}: {uuid.uuid4().hex[:12]} ({names})"
+
+
+def prepare_repo(config, repo, use_cache=True):
+    """Return {"repo", "prompt", "decision", "plan", "key", "cached", "notice", "snapshot"} for repo,
+    or None if nothing is staged.
+
+    The diff is routed with ai.routes like a single-repo commit; decision
+    is the routing decision (None without routes) and plan the prompt's
+    plan_request() for the routed model. With git.snapshot, the index is
+    snapshotted first and snapshot holds it for commit_repo; otherwise
+    snapshot is None.
+    """
+    snapshot = take_snapshot(repo) if config.git.snapshot else None
+    diff = snapshot_diff(snapshot, repo) if snapshot else staged_diff(repo)
+    if not diff:
+        return None
+    config, decision = route_config(config, diff)
+    # A snapshot's blobs are read from its trees, not the live index
+    revs = snapshot_revs(snapshot, repo) if snapshot else None
+    prepared, findings = preprocess_diff(config, diff, repo=repo, revs=revs)
+    prompt = make_prompt(config, prepared, snapshot_files(snapshot, repo) if snapshot else staged_files(repo))
+    plan = plan_request(config, prompt)
+    key = message_key(plan, prompt)
+    cached = get_cached_message(key, max_age=config.ai.cache_ttl) if config.ai.cache and use_cache else None
+    return {
+        "repo": repo,
+        "prompt": prompt,
+        "decision": decision,
+        "plan": plan,
+        "key": key,
+        "cached": cached,
+        "notice": redaction_notice(findings) if findings else None,
+        "snapshot": snapshot,
+    }
+
+def generate_all(generator_for, config, repos, concurrency=4, use_cache=True):
+    """Prepare and generate messages for every repo concurrently.
+
+    Prompts that aren't cached are checked with check_plan() and sent to
+    generator_for(provider, model) for their planned model.
+    Returns (changes, empty) where changes is a list of prepared dicts, in
+    repo order, with "message" or "error" filled in, and empty lists the
+    repos with nothing staged.
+    """
+    def run(repo):
+        try:
+            change = prepare_repo(config, repo, use_cache=use_cache)
+        except Exception as e:
+            return {"repo": repo, "message": None, "error": str(e), "notice": None}
+        if change is None:
+            return None
+        try:
+            if change["cached"]:
+                change["message"] = change["cached"]
+            else:
+                plan = change["plan"]
+                check_plan(config, plan)
+                generate = generator_for(plan["provider"], plan["model"])
+                if change["decision"]:
+                    change["decision"].update(provider=plan["provider"], model=plan["model"])
+                    generate = logged_generator(generate, change["decision"])
+                change["message"] = generate(change["prompt"])
+            change["error"] = None
+        except Exception as e:
+            change["message"] = None
+            change["error"] = str(e)
+        return change
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run, repos))
+    changes = [change for change in results if change is not None]
+    empty = [repo for repo, change in zip(repos, results) if change is None]
+    return changes, empty
@@ -0,0 +1,173 @@
+import email.utils
+import os
+import sqlite3
+import time
+
+import click
+
+from smart_commit.tokens import estimate_tokens
+
+
+def ratelimit_path():
+    """Return the path of the shared rate limit state in the app dir."""
+    return os.path.join(click.get_app_dir("smart-commit"), "ratelimit.db")
+
+
+def _connect():
+    path = ratelimit_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Autocommit mode so BEGIN IMMEDIATE below controls the transaction
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS buckets ("
+        "key TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL, "
+        "updated REAL NOT NULL, blocked_until REAL NOT NULL DEFAULT 0)"
+    )
+    return conn
+
+
+def acquire(key: str, requests_per_minute=None, tokens_per_minute=None, tokens: int = 0,
+            sleep=time.sleep, clock=time.time):
+    """Block until one request of `tokens` tokens fits the shared bucket for key.
+
+    The bucket lives in SQLite, so every smart-commit process on the host
+    draws from the same budget. Requests larger than the whole per-minute
+    token budget wait for a full bucket instead of waiting forever.
+    """
+    rpm = requests_per_minute
+    tpm = tokens_per_minute
+    cost = min(tokens, tpm) if tpm else 0
+
+    conn = _connect()
+    try:
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = clock()
+                row = conn.execute(
+                    "SELECT requests, tokens, updated, blocked_until FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    req_left, tok_left, blocked_until = float(rpm or 0), float(tpm or 0), 0.0
+                else:
+                    req_left, tok_left, updated, blocked_until = row
+                    elapsed = max(0.0, now - updated)
+                    if rpm:
+                        req_left = min(float(rpm), req_left + elapsed * rpm / 60.0)
+                    if tpm:
+                        tok_left = min(float(tpm), tok_left + elapsed * tpm / 60.0)
+
+                if now < blocked_until:
+                    wait = blocked_until - now
+                else:
+                    wait = 0.0
+                    if rpm and req_left < 1:
+                        wait = max(wait, (1 - req_left) * 60.0 / rpm)
+                    if tpm and tok_left < cost:
+                        wait = max(wait, (cost - tok_left) * 60.0 / tpm)
+                    if wait == 0.0:
+                        if rpm:
+                            req_left -= 1
+                        if tpm:
+                            tok_left -= cost
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, requests, tokens, updated, blocked_until) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, req_left, tok_left, now, blocked_until),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            if wait == 0.0:
+                return
+            sleep(wait)
+    finally:
+        conn.close()
+
+
+def block(key: str, seconds: float, clock=time.time):
+    """Pause every process using key for `seconds`, e.g. after a 429."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        until = clock() + seconds
+        updated = conn.execute(
+            "UPDATE buckets SET blocked_until = MAX(blocked_until, ?) WHERE key = ?", (until, key)
+        ).rowcount
+        if not updated:
+            conn.execute(
+                "INSERT INTO buckets (key, requests, tokens, updated, blocked_until) VALUES (?, 0, 0, ?, ?)",
+                (key, clock(), until),
+            )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def _status_code(exc):
+    for obj in (exc, getattr(exc, "response", None)):
+        code = getattr(obj, "status_code", None) or getattr(obj, "code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def retry_after(exc):
+    """Return the delay requested by a rate limit error, or None if exc isn't one.
+
+    Understands `retry-after-ms`, `retry-after` in seconds or as an HTTP date,
+    and falls back to 0 for 429s that carry no hint.
+    """
+    if _status_code(exc) != 429 and type(exc).__name__ not in ("RateLimitError", "ResourceExhausted"):
+        return None
+
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            parsed = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            # Python >= 3.10 raises on unparseable dates instead of returning None
+            parsed = None
+        if parsed is not None:
+            return max(0.0, parsed.timestamp() - time.time())
+    return 0.0
+
+
+def rate_limited(generate, provider: str, model: str, limits, sleep=time.sleep):
+    """Wrap a generate(prompt) callable with the shared token bucket for provider/model.
+
+    On rate limit errors the whole host backs off for the server's
+    Retry-After (or exponentially when absent) before retrying, up to
+    limits.max_retries times.
+    """
+    key = f"{provider}/{model}"
+
+    def wrapper(prompt):
+        attempt = 0
+        while True:
+            acquire(key, limits.requests_per_minute, limits.tokens_per_minute,
+                    estimate_tokens(prompt, provider, model), sleep=sleep)
+            try:
+                return generate(prompt)
+            except Exception as e:
+                delay = retry_after(e)
+                if delay is None or attempt >= limits.max_retries:
+                    raise
+                block(key, delay or min(2 ** attempt, 60))
+                attempt += 1
+
+    return wrapper
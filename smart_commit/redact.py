@@ -0,0 +1,197 @@
+"""
+Scrub secrets (and optionally PII) from a diff before it leaves the machine.
+
+Scanning happens in two stages so large diffs stay cheap:
+
+1. A prefilter finds candidate lines with C-speed substring searches for a
+   handful of trigger literals (assignment keywords, "://", "-----BEGIN")
+   and for runs of 20+ token characters, which every supported key format
+   contains.
+2. Only those lines are matched against one precompiled regex that combines
+   all detectors. Long random-looking tokens are only redacted when their
+   Shannon entropy says they look like real credentials. Assignments to
+   secret-like keys are redacted when the value is a quoted literal or on
+   a .env-style line; unquoted values in code must also mix letters and
+   digits and pass the entropy check, so identifiers and calls are left
+   alone.
+"""
+import math
+import re
+from collections import Counter
+
+_SECRET_PATTERNS = [
+    ("private-key", r"-----BEGIN [A-Z ]*PRIVATE KEY-----[\s\S]{0,16384}?-----END [A-Z ]*PRIVATE KEY-----"),
+    ("aws-access-key", r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b"),
+    ("github-token", r"\b(?:gh[pousr]_[A-Za-z0-9]{36,}|github_pat_[A-Za-z0-9_]{22,})"),
+    ("slack-token", r"\bxox[abposr]-[A-Za-z0-9-]{10,}"),
+    ("google-api-key", r"\bAIza[0-9A-Za-z_\-]{35}"),
+    ("anthropic-key", r"\bsk-ant-[A-Za-z0-9_\-]{20,}"),
+    ("openai-key", r"\bsk-(?:proj-|svcacct-)?[A-Za-z0-9_\-]{20,}"),
+    ("stripe-key", r"\b[rs]k_(?:live|test)_[0-9A-Za-z]{16,}"),
+    ("jwt", r"\beyJ[A-Za-z0-9_\-]{8,}\.eyJ[A-Za-z0-9_\-]{8,}\.[A-Za-z0-9_\-]{8,}"),
+    ("url-credentials", r"(?<=://)[^/\s:@]{1,256}:[^/\s@]{1,256}(?=@)"),
+    ("assignment",
+     r"(?i:api[_\-]?key|secret|token|passw(?:or)?d|credential)"
+     r"[A-Za-z0-9_.\-]*[\"']?\s*[:=]\s*(?P<quote>[\"'])?(?P<value>[^\s\"'`,;()]{8,})"),
+    ("high-entropy", r"(?<![A-Za-z0-9+/_\-])[A-Za-z0-9+/_\-]{32,}={0,2}"),
+]
+
+_PII_PATTERNS = [
+    ("email", r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9\-]+(?:\.[A-Za-z0-9\-]+)*\.[A-Za-z]{2,}\b"),
+]
+
+# Lowercase literals that must appear on a line for a detector to fire
+_SECRET_TRIGGERS = [b"key", b"secret", b"token", b"passw", b"credential", b"://", b"-----begin"]
+_PII_TRIGGERS = [b"@"]
+
+# Every key format above contains a run of at least this many token characters
+_MIN_KEY_RUN = 20
+_TOKEN_MASK = bytes(
+    0x61 if i < 128 and (chr(i).isalnum() or chr(i) in "+/_-") else 0x20
+    for i in range(256)
+)
+
+# Bits per character above which a generic match counts as a credential
+ASSIGNMENT_ENTROPY = 3.5
+TOKEN_ENTROPY = 4.3
+
+# NAME=value lines as in .env files and shell exports, after the diff marker
+_ENV_LINE = re.compile(rb"(?m)^[+\- ]?[ \t]*(?:export[ \t]+)?[A-Z][A-Z0-9_]*=\S")
+
+
+def _compile(patterns):
+    return re.compile(
+        "|".join(f"(?P<{kind.replace('-', '_')}>{pattern})" for kind, pattern in patterns).encode("ascii")
+    )
+
+_SECRETS = _compile(_SECRET_PATTERNS)
+_SECRETS_AND_PII = _compile(_SECRET_PATTERNS + _PII_PATTERNS)
+
+
+def shannon_entropy(text):
+    """Return the Shannon entropy of text in bits per character."""
+    if not text:
+        return 0.0
+    n = len(text)
+    return -sum(c / n * math.log2(c / n) for c in Counter(text).values())
+
+def _looks_random(token):
+    if re.fullmatch(rb"[0-9a-fA-F]+", token):
+        # Commit ids and checksums are hex and show up in diffs legitimately
+        return False
+    has_digit = any(48 <= c <= 57 for c in token)
+    has_alpha = any(65 <= c <= 90 or 97 <= c <= 122 for c in token)
+    return has_digit and has_alpha and shannon_entropy(token) >= TOKEN_ENTROPY
+
+
+def _assigned_secret(m, chunk):
+    """Whether an assignment match holds a literal credential rather than code."""
+    value = m.group("value")
+    if chunk[m.end():m.end() + 1] == b"(":
+        # token_count = estimate_tokens(prompt)
+        return False
+    # A literal under a secret-like key is a credential however short it is;
+    # a string of n characters never has more than log2(n) bits per character
+    if m.group("quote"):
+        return True
+    line_start = chunk.rfind(b"\n", 0, m.start()) + 1
+    if _ENV_LINE.match(chunk, line_start):
+        return True
+    # Unquoted values in code are usually identifiers, attribute paths or
+    # types (token: Optional[int]); literals mix letters and digits
+    if shannon_entropy(value) < ASSIGNMENT_ENTROPY:
+        return False
+    has_digit = any(48 <= c <= 57 for c in value)
+    has_alpha = any(65 <= c <= 90 or 97 <= c <= 122 for c in value)
+    return has_digit and has_alpha and b"." not in value and b"[" not in value
+
+def _line_span(data, i):
+    start = data.rfind(b"\n", 0, i) + 1
+    end = data.find(b"\n", i)
+    return start, len(data) if end == -1 else end
+
+def _candidate_spans(data, triggers):
+    """Return sorted, merged (start, end) spans of lines that may hold a secret."""
+    lowered = data.lower()
+    spans = []
+
+    def scan(haystack, needle):
+        i = haystack.find(needle)
+        while i != -1:
+            start, end = _line_span(data, i)
+            if needle == b"-----begin":
+                # Keep the whole key block together
+                block_end = lowered.find(b"private key-----", end, end + 16384)
+                if block_end != -1:
+                    end = _line_span(data, block_end)[1]
+            spans.append((start, end))
+            i = haystack.find(needle, end)
+
+    for trigger in triggers:
+        scan(lowered, trigger)
+    scan(data.translate(_TOKEN_MASK), b"a" * _MIN_KEY_RUN)
+
+    spans.sort()
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def redact(text, pii=False):
+    """Return (redacted_text, findings) for text.
+
+    findings is a list of {"kind": ..., "line": ...} dicts, one per redaction,
+    with 1-based line numbers.
+    """
+    data = text.encode("utf-8", errors="surrogateescape")
+    pattern = _SECRETS_AND_PII if pii else _SECRETS
+    triggers = _SECRET_TRIGGERS + (_PII_TRIGGERS if pii else [])
+
+    findings = []
+    out = []
+    last = 0
+    line = 1
+
+    for start, end in _candidate_spans(data, triggers):
+        line += data.count(b"\n", last, start)
+        out.append(data[last:start])
+        chunk = data[start:end]
+        # (offset, line) of the previous match, so numbering the findings of
+        # a chunk stays linear however many there are
+        cursor = [0, line]
+
+        def replace(m):
+            kind = m.lastgroup.replace("_", "-")
+            match = m.group(0)
+            if kind == "assignment":
+                if not _assigned_secret(m, chunk):
+                    return match
+                replacement = match[:m.start("value") - m.start()] + b"[REDACTED:assignment]"
+            elif kind == "high-entropy":
+                if not _looks_random(match):
+                    return match
+                replacement = b"[REDACTED:high-entropy]"
+            else:
+                replacement = f"[REDACTED:{kind}]".encode("ascii")
+            cursor[1] += chunk.count(b"\n", cursor[0], m.start())
+            cursor[0] = m.start()
+            findings.append({"kind": kind, "line": cursor[1]})
+            return replacement
+
+        out.append(pattern.sub(replace, chunk))
+        line += chunk.count(b"\n")
+        last = end
+
+    if not findings:
+        return text, findings
+    out.append(data[last:])
+    return b"".join(out).decode("utf-8", errors="surrogateescape"), findings
+
+def summarize_findings(findings):
+    """Return a short human summary such as '2 openai-key, 1 private-key'."""
+    counts = Counter(f["kind"] for f in findings)
+    return ", ".join(f"{n} {kind}" for kind, n in counts.most_common())
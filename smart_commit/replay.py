@@ -0,0 +1,159 @@
+"""
+Record/replay provider for deterministic, offline runs.
+
+In record mode every request to the real provider is stored in a SQLite
+file, keyed by a hash of provider, model, output schema and prompt, along
+with its response, token usage and latency. Replay mode serves those
+responses back without any network access or API key, optionally sleeping
+for the recorded latency (or a fixed one) so load and latency tests stay
+realistic. Auto mode replays what it has and records the rest.
+
+Enable it in config.yml under `ai.replay`, or for one process with
+SMART_COMMIT_REPLAY=<mode>[:<path>], which takes precedence:
+
+    SMART_COMMIT_REPLAY=record:fixtures/replay.db smart-commit eval run corpus.jsonl
+    SMART_COMMIT_REPLAY=replay:fixtures/replay.db smart-commit eval run corpus.jsonl
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import click
+
+ENV_VAR = "SMART_COMMIT_REPLAY"
+MODES = ("record", "replay", "auto")
+
+
+def default_store_path():
+    """Return the path of the default replay store in the app dir."""
+    return os.path.join(click.get_app_dir("smart-commit"), "replay.db")
+
+
+def replay_settings(config, environ=os.environ):
+    """Return the effective ReplayConfig, or None when record/replay is off.
+
+    SMART_COMMIT_REPLAY overrides ai.replay; its path defaults to the
+    configured one, then to replay.db in the app dir.
+    """
+    from smart_commit.config_loader import ReplayConfig
+
+    configured = config.ai.replay
+    value = environ.get(ENV_VAR, "").strip()
+    if not value:
+        return configured
+    if value.lower() in ("off", "0", "false"):
+        return None
+    mode, _, path = value.partition(":")
+    if mode not in MODES:
+        raise ValueError(f"{ENV_VAR} must be <mode>[:<path>] with mode one of {', '.join(MODES)}")
+    settings = configured.model_dump() if configured else {}
+    settings["mode"] = mode
+    if path:
+        settings["path"] = path
+    return ReplayConfig(**settings)
+
+
+def request_key(provider, model, prompt, schema=None):
+    """Return the store key of one request."""
+    h = hashlib.sha256()
+    for part in (provider, model, json.dumps(schema, sort_keys=True) if schema else "", prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ReplayStore:
+    """Request-hash -> response mappings in one SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, provider TEXT NOT NULL, model TEXT NOT NULL, "
+            "result TEXT NOT NULL, usage TEXT, latency REAL, created REAL NOT NULL)"
+        )
+        return conn
+
+    def get(self, key):
+        """Return (result, usage, latency) for key, or None if it wasn't recorded."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT result, usage, latency FROM responses WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        result, usage, latency = row
+        return json.loads(result), json.loads(usage) if usage else None, latency
+
+    def put(self, key, provider, model, result, usage, latency=None):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, provider, model, json.dumps(result, ensure_ascii=False),
+                         json.dumps(usage) if usage else None, latency, time.time()),
+                    )
+            finally:
+                conn.close()
+
+    def __len__(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        finally:
+            conn.close()
+
+
+def replay_provider(settings, provider, model, connect, schema=None, with_usage=False,
+                    clock=time.monotonic, sleep=time.sleep):
+    """Return a generate callable that records to or replays from the store in settings.
+
+    connect() must return the real provider's (result, usage) callable, as
+    from initialize(..., with_usage=True). It is only called when a request
+    has to go to the provider, so pure replay needs no API key.
+    """
+    store = ReplayStore(settings.path or default_store_path())
+    real = []
+    lock = threading.Lock()
+
+    def call_provider(prompt, key):
+        with lock:
+            if not real:
+                real.append(connect())
+        started = clock()
+        result, usage = real[0](prompt)
+        latency = clock() - started
+        store.put(key, provider, model, result, usage, latency if settings.record_latency else None)
+        return result, usage
+
+    def complete(prompt):
+        key = request_key(provider, model, prompt, schema)
+        if settings.mode != "record":
+            hit = store.get(key)
+            if hit is not None:
+                result, usage, latency = hit
+                delay = latency if settings.latency == "recorded" else settings.latency
+                if delay:
+                    sleep(delay)
+                return result, usage or {"input_tokens": None, "output_tokens": None}
+            if settings.mode == "replay":
+                raise LookupError(
+                    f"No recorded response for this {provider}/{model} request in {store.path}. "
+                    f"Record it first with {ENV_VAR}=record or auto."
+                )
+        return call_provider(prompt, key)
+
+    if with_usage:
+        return complete
+    return lambda prompt: complete(prompt)[0]
@@ -0,0 +1,187 @@
+"""
+Route each commit to a provider/model by how complex its diff is.
+
+Cheap features are read from the staged diff (files, changed lines,
+languages and the share of pure renames) and matched against the tiers in
+`ai.routes`, in order; the first tier whose limits all hold wins, and
+`ai.provider`/`ai.model` is used when none does. Every routed request is
+appended to routes.jsonl in the app dir with its features and latency,
+which `smart-commit route-stats` summarizes for tuning the thresholds.
+"""
+import json
+import os
+import re
+import statistics
+import time
+
+import click
+
+from smart_commit.semantic import split_diff
+from smart_commit.tokens import split_model
+
+LANGUAGES = {
+    ".py": "python", ".pyi": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".go": "go", ".rs": "rust", ".java": "java", ".kt": "kotlin", ".scala": "scala",
+    ".rb": "ruby", ".php": "php", ".swift": "swift", ".cs": "csharp",
+    ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".hpp": "cpp",
+    ".sh": "shell", ".bash": "shell", ".sql": "sql",
+    ".html": "html", ".css": "css", ".scss": "css",
+    ".md": "markdown", ".rst": "text", ".txt": "text",
+    ".yml": "yaml", ".yaml": "yaml", ".json": "json", ".toml": "toml",
+}
+
+_RENAME = re.compile(r"(?m)^rename from ")
+
+
+def diff_features(diff):
+    """Return the routing features of a unified diff."""
+    files = split_diff(diff)
+    languages = set()
+    added = removed = renames = 0
+    for old_path, new_path, text in files:
+        path = new_path or old_path or ""
+        ext = os.path.splitext(path)[1].lower()
+        languages.add(LANGUAGES.get(ext, ext or os.path.basename(path)))
+        if _RENAME.search(text):
+            renames += 1
+        for line in text.splitlines():
+            if line.startswith("+") and not line.startswith("+++"):
+                added += 1
+            elif line.startswith("-") and not line.startswith("---"):
+                removed += 1
+    return {
+        "files": len(files),
+        "lines": added + removed,
+        "added": added,
+        "removed": removed,
+        "languages": sorted(languages),
+        "renames": renames,
+        "rename_ratio": round(renames / len(files), 3) if files else 0.0,
+    }
+
+
+def _matches(route, features):
+    if route.max_files is not None and features["files"] > route.max_files:
+        return False
+    if route.max_lines is not None and features["lines"] > route.max_lines:
+        return False
+    if route.max_languages is not None and len(features["languages"]) > route.max_languages:
+        return False
+    if route.min_rename_ratio is not None and features["rename_ratio"] < route.min_rename_ratio:
+        return False
+    return True
+
+
+def choose_route(config, features):
+    """Return {"provider", "model", "tier", "features"} for the first matching tier.
+
+    tier is the index into ai.routes, or None when no tier matched and the
+    default ai.provider/ai.model is used.
+    """
+    for tier, route in enumerate(config.ai.routes):
+        if _matches(route, features):
+            provider, model = split_model(route.model, config.ai.provider)
+            return {"provider": provider, "model": model, "tier": tier, "features": features}
+    return {"provider": config.ai.provider, "model": config.ai.model, "tier": None, "features": features}
+
+
+def routed_config(config, provider, model):
+    """Return a copy of config with ai.provider and ai.model replaced."""
+    return config.model_copy(update={"ai": config.ai.model_copy(update={"provider": provider, "model": model})})
+
+
+def describe(decision):
+    """Return a one-line summary of a routing decision."""
+    f = decision["features"]
+    tier = "default" if decision["tier"] is None else f"tier {decision['tier']}"
+    return (f"{f['files']} files, {f['lines']} lines, {len(f['languages'])} languages "
+            f"-> {decision['provider']}/{decision['model']} ({tier})")
+
+
+# ── Decision log ────────────────────────────────────
+
+def log_path():
+    """Return the path of the routing decision log in the app dir."""
+    return os.path.join(click.get_app_dir("smart-commit"), "routes.jsonl")
+
+
+def log_decision(decision, latency, error=None):
+    """Append a routed request and its outcome to the decision log."""
+    record = {
+        "ts": round(time.time(), 3),
+        "provider": decision["provider"],
+        "model": decision["model"],
+        "tier": decision["tier"],
+        "features": decision["features"],
+        "latency_s": round(latency, 4),
+        "ok": error is None,
+    }
+    if error is not None:
+        record["error"] = str(error)
+    path = log_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # One short append per line keeps concurrent writers from interleaving
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def logged_generator(generate, decision, clock=time.monotonic):
+    """Wrap generate so every call is timed and written to the decision log."""
+    def wrapper(prompt):
+        started = clock()
+        try:
+            result = generate(prompt)
+        except Exception as e:
+            log_decision(decision, clock() - started, error=e)
+            raise
+        log_decision(decision, clock() - started)
+        return result
+    return wrapper
+
+
+def read_log(since=None):
+    """Return the logged decisions, optionally only those after the since timestamp."""
+    try:
+        with open(log_path(), encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if since is None or record.get("ts", 0) >= since:
+            records.append(record)
+    return records
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def route_stats(records):
+    """Summarize logged decisions per tier and model, in tier order."""
+    groups = {}
+    for record in records:
+        groups.setdefault((record["tier"], record["provider"], record["model"]), []).append(record)
+
+    stats = []
+    for (tier, provider, model), group in groups.items():
+        latencies = sorted(r["latency_s"] for r in group if r["ok"])
+        lines = sorted(r["features"]["lines"] for r in group)
+        stats.append({
+            "tier": tier,
+            "model": f"{provider}/{model}",
+            "requests": len(group),
+            "errors": sum(1 for r in group if not r["ok"]),
+            "lines_median": statistics.median(lines),
+            "lines_max": lines[-1],
+            "files_max": max(r["features"]["files"] for r in group),
+            "latency_p50_s": round(_percentile(latencies, 0.5), 4) if latencies else None,
+            "latency_p90_s": round(_percentile(latencies, 0.9), 4) if latencies else None,
+        })
+    return sorted(stats, key=lambda s: (s["tier"] is None, s["tier"] or 0, s["model"]))
@@ -0,0 +1,378 @@
+"""
+Language-aware diff reduction.
+
+Replaces the unified diff of Python, JavaScript/TypeScript and Go files with
+a compact list of added, removed and modified functions, classes and types
+plus the first few changed lines, which is usually all the model needs to
+write the commit message.
+"""
+import ast
+import hashlib
+import os
+import re
+import subprocess
+from collections import namedtuple
+
+Symbol = namedtuple("Symbol", ["kind", "name", "signature", "digest"])
+
+LANGUAGES = {
+    ".py": "python",
+    ".pyi": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".go": "go",
+}
+
+
+def _digest(text):
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()[:12]
+
+
+_ESCAPES = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13, '"': 34, "\\": 92}
+
+def unquote_path(name):
+    """Undo git's C-style quoting of a path ("caf\\303\\251.txt" -> café.txt)."""
+    if len(name) < 2 or name[0] != '"' or name[-1] != '"':
+        return name
+    raw = bytearray()
+    body = name[1:-1]
+    i = 0
+    while i < len(body):
+        c = body[i]
+        if c == "\\" and i + 1 < len(body):
+            octal = body[i + 1:i + 4]
+            if len(octal) == 3 and all(d in "01234567" for d in octal):
+                raw.append(int(octal, 8))
+                i += 4
+                continue
+            if body[i + 1] in _ESCAPES:
+                raw.append(_ESCAPES[body[i + 1]])
+                i += 2
+                continue
+        raw += c.encode("utf-8")
+        i += 1
+    return os.fsdecode(bytes(raw))
+
+def _diff_path(name, prefix):
+    if name == "/dev/null":
+        return None
+    name = unquote_path(name.rstrip("\t"))
+    return name[len(prefix):] if name.startswith(prefix) else name
+
+_QUOTED = r'"(?:\\.|[^"\\])*"'
+_HEADER = re.compile(rf"diff --git ({_QUOTED}|a/.*) ({_QUOTED}|b/.*)$")
+
+def split_diff(diff):
+    """Split a unified diff into (old_path, new_path, text) per file.
+
+    At most one of the paths is None (the side of an added or deleted file).
+    """
+    files = []
+    for chunk in re.split(r"(?m)^(?=diff --git )", diff):
+        if not chunk.startswith("diff --git "):
+            continue
+        old_path = new_path = None
+        for line in chunk.splitlines():
+            if line.startswith("--- "):
+                old_path = _diff_path(line[4:], "a/")
+            elif line.startswith("+++ "):
+                new_path = _diff_path(line[4:], "b/")
+                break
+        if old_path is None and new_path is None:
+            # Binary files and pure renames have no ---/+++ lines
+            header = _HEADER.match(chunk.splitlines()[0])
+            if header:
+                old_path, new_path = _diff_path(header.group(1), "a/"), _diff_path(header.group(2), "b/")
+            else:
+                old_path = new_path = chunk.splitlines()[0][len("diff --git "):]
+        files.append((old_path, new_path, chunk))
+    return files
+
+
+# ── Python ──────────────────────────────────────────
+
+def _python_signature(node, name, lines):
+    if isinstance(node, ast.ClassDef):
+        return f"class {name}"
+    if not hasattr(ast, "unparse"):  # Python 3.8
+        return lines[node.lineno - 1].strip().rstrip(":")
+    keyword = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{keyword} {name}({ast.unparse(node.args)}){returns}"
+
+def _python_symbols(source):
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    symbols = {}
+
+    def visit(body, prefix):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = prefix + node.name
+                kind = "class" if isinstance(node, ast.ClassDef) else ("method" if prefix else "function")
+                signature = _python_signature(node, name, lines)
+                symbols[name] = Symbol(kind, name, signature, _digest(ast.dump(node)))
+                if isinstance(node, ast.ClassDef):
+                    visit(node.body, name + ".")
+
+    visit(tree.body, "")
+    return symbols
+
+
+# ── JavaScript / TypeScript / Go ────────────────────
+
+_STRIP = re.compile(
+    r"//[^\n]*|/\*.*?\*/|`(?:\\.|[^`\\])*`|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'",
+    re.S,
+)
+
+def _blank(source):
+    """Replace comments and string literals with spaces, keeping offsets intact."""
+    return _STRIP.sub(lambda m: re.sub(r"[^\n]", " ", m.group(0)), source)
+
+def _block_end(text, start):
+    """Return the index just past the brace block opening at or after start."""
+    open_at = text.find("{", start)
+    if open_at == -1:
+        return len(text)
+    depth = 0
+    for i in range(open_at, len(text)):
+        if text[i] == "{":
+            depth += 1
+        elif text[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(text)
+
+def _statement_end(text, start):
+    """Return the index just past the statement starting at start (its ; or line end at depth 0)."""
+    depth = 0
+    for i in range(start, len(text)):
+        c = text[i]
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            if depth == 0:
+                return i
+            depth -= 1
+        elif depth == 0 and c in ";\n":
+            return i + 1
+    return len(text)
+
+_JS_DECLS = [
+    ("function", re.compile(r"(?m)^[ \t]*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)\s*(\([^)]*\))")),
+    ("class", re.compile(r"(?m)^[ \t]*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(\w+)()")),
+    ("function", re.compile(r"(?m)^[ \t]*(?:export\s+)?(?:const|let|var)\s+(\w+)\s*(?::[^=\n]+)?=\s*(?:async\s+)?(\([^)]*\)|\w+)\s*(?::[^=\n]+)?=>")),
+    ("interface", re.compile(r"(?m)^[ \t]*(?:export\s+)?interface\s+(\w+)()")),
+    ("type", re.compile(r"(?m)^[ \t]*(?:export\s+)?type\s+(\w+)()\s*(?:<[^>]*>)?\s*=")),
+]
+_JS_METHOD = re.compile(
+    r"(?m)^[ \t]*(?:(?:public|private|protected|static|async|readonly|override|get|set)\s+)*"
+    r"(#?\w+)\s*(\([^)]*\))\s*(?::[^{;\n]+)?\{"
+)
+_JS_KEYWORDS = {"if", "for", "while", "switch", "catch", "function", "return", "with"}
+
+def _js_symbols(source):
+    text = _blank(source)
+    symbols = {}
+    for kind, pattern in _JS_DECLS:
+        for m in pattern.finditer(text):
+            name = m.group(1)
+            body_at = len(text) - len(text[m.end():].lstrip())
+            if kind == "type":
+                end = text.find(";", m.end()) + 1 or len(text)
+            elif m.group(0).endswith("=>") and not text.startswith("{", body_at):
+                # Expression-bodied arrow function: `const a = (x) => x + 1;`
+                end = _statement_end(text, body_at)
+            else:
+                end = _block_end(text, m.end())
+            signature = f"{kind} {name}{m.group(2) if kind == 'function' else ''}"
+            symbols[name] = Symbol(kind, name, signature, _digest(source[m.start():end]))
+            if kind == "class":
+                body_start = text.find("{", m.end()) + 1
+                body = text[body_start:end - 1]
+                depth = 0
+                pos = 0
+                for mm in _JS_METHOD.finditer(body):
+                    depth += body.count("{", pos, mm.start()) - body.count("}", pos, mm.start())
+                    pos = mm.start()
+                    if depth != 0 or mm.group(1) in _JS_KEYWORDS:
+                        continue
+                    mend = _block_end(body, mm.end() - 1)
+                    mname = f"{name}.{mm.group(1)}"
+                    symbols[mname] = Symbol(
+                        "method", mname, f"method {mname}{mm.group(2)}",
+                        _digest(source[body_start + mm.start():body_start + mend]),
+                    )
+    return symbols
+
+_GO_FUNC = re.compile(r"(?m)^func\s+(?:\(\s*(?:\w+\s+)?\*?(\w+)(?:\[[^\]]*\])?\s*\)\s*)?(\w+)\s*(\([^)]*\)[^{\n]*)\{")
+_GO_TYPE = re.compile(r"(?m)^type\s+(\w+)\s+(struct|interface)?")
+
+def _go_symbols(source):
+    text = _blank(source)
+    symbols = {}
+    for m in _GO_FUNC.finditer(text):
+        receiver, name = m.group(1), m.group(2)
+        full = f"{receiver}.{name}" if receiver else name
+        end = _block_end(text, m.end() - 1)
+        symbols[full] = Symbol(
+            "method" if receiver else "func", full,
+            f"func {full}{m.group(3).rstrip()}", _digest(source[m.start():end]),
+        )
+    for m in _GO_TYPE.finditer(text):
+        name, kind = m.group(1), m.group(2)
+        if kind:
+            end = _block_end(text, m.end())
+        else:
+            end = text.find("\n", m.end()) % (len(text) + 1)
+        signature = f"type {name} {kind}" if kind else f"type {name}"
+        symbols[name] = Symbol(kind or "type", name, signature, _digest(source[m.start():end]))
+    return symbols
+
+_EXTRACTORS = {
+    "python": _python_symbols,
+    "javascript": _js_symbols,
+    "typescript": _js_symbols,
+    "go": _go_symbols,
+}
+
+
+def language_for(path):
+    """Return the language name for path, or None if it isn't supported."""
+    return LANGUAGES.get(os.path.splitext(path or "")[1].lower())
+
+def extract_symbols(source, language):
+    """Return {qualified name: Symbol} for the top-level definitions in source."""
+    if not source:
+        return {}
+    return _EXTRACTORS[language](source)
+
+def compare_symbols(old, new):
+    """Return (added, removed, modified) symbol lists between two extractions.
+
+    modified holds (old_symbol, new_symbol) pairs whose source changed. A
+    class only counts as modified when none of its members explain the change.
+    """
+    added = [new[name] for name in new if name not in old]
+    removed = [old[name] for name in old if name not in new]
+    modified = [
+        (old[name], new[name]) for name in new
+        if name in old and old[name].digest != new[name].digest
+    ]
+    touched = {sym.name for sym in added + removed} | {after.name for _, after in modified}
+    modified = [
+        (before, after) for before, after in modified
+        if not any(other.startswith(after.name + ".") for other in touched)
+    ]
+    return added, removed, modified
+
+
+def _changed_lines(file_diff):
+    in_hunk = False
+    for line in file_diff.splitlines():
+        if line.startswith("@@"):
+            in_hunk = True
+        elif in_hunk and line[:1] in ("+", "-"):
+            yield line
+
+def summarize_file(path, language, old_source, new_source, file_diff, max_hunk_lines=20):
+    """Return the semantic summary of one file's change, or None if it can't be parsed."""
+    try:
+        old = extract_symbols(old_source, language)
+        new = extract_symbols(new_source, language)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+    added, removed, modified = compare_symbols(old, new)
+    out = [f"diff --git a/{path} b/{path}", f"# semantic summary ({language})"]
+    if old_source is None:
+        out.append("new file")
+    elif new_source is None:
+        out.append("deleted file")
+    for sym in added:
+        out.append(f"+ {sym.signature}")
+    for sym in removed:
+        out.append(f"- {sym.signature}")
+    for before, after in modified:
+        if before.signature != after.signature:
+            out.append(f"~ {before.signature} -> {after.signature}")
+        else:
+            out.append(f"~ {after.signature} (body changed)")
+
+    changed = list(_changed_lines(file_diff))
+    if changed:
+        shown = changed[:max_hunk_lines]
+        out.append(f"@@ changed lines ({len(shown)} of {len(changed)}) @@")
+        out.extend(shown)
+    return "\n".join(out) + "\n"
+
+
+def read_blobs(specs, repo=None):
+    """Read many `<rev>:<path>` blobs with one git cat-file process.
+
+    Returns {spec: text}; specs that don't exist map to None. repo is the
+    repository to read from, by default the current directory.
+    """
+    if not specs:
+        return {}
+    proc = subprocess.run(
+        ["git", "cat-file", "--batch"],
+        input="".join(spec + "\n" for spec in specs).encode("utf-8"),
+        stdout=subprocess.PIPE, check=True, cwd=repo,
+    )
+    out = proc.stdout
+    blobs = {}
+    pos = 0
+    for spec in specs:
+        header_end = out.index(b"\n", pos)
+        header = out[pos:header_end].split()
+        pos = header_end + 1
+        if len(header) == 3 and header[1] == b"blob":
+            size = int(header[2])
+            blobs[spec] = out[pos:pos + size].decode("utf-8", errors="replace")
+            pos += size + 1
+        else:
+            blobs[spec] = None
+    return blobs
+
+
+def reduce_diff(diff, max_hunk_lines=20, base="HEAD", blob_reader=None, repo=None, new=""):
+    """Replace supported files' diffs with semantic summaries where that is shorter.
+
+    Old sources come from `base`, new sources from revision `new` or, by
+    default, the index of `repo` (the current directory unless given).
+    Files in other languages, whose sources can't be read, or that fail to
+    parse keep their original diff.
+    """
+    files = split_diff(diff)
+    specs = []
+    for old_path, new_path, _ in files:
+        if language_for(new_path or old_path):
+            if old_path:
+                specs.append(f"{base}:{old_path}")
+            if new_path:
+                specs.append(f"{new}:{new_path}")
+    try:
+        blobs = blob_reader(specs) if blob_reader else read_blobs(specs, repo=repo)
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        return diff
+
+    out = []
+    for old_path, new_path, file_diff in files:
+        path = new_path or old_path
+        language = language_for(path)
+        summary = None
+        if language:
+            old_source = blobs.get(f"{base}:{old_path}") if old_path else None
+            new_source = blobs.get(f"{new}:{new_path}") if new_path else None
+            # A missing blob would read as an added or deleted file
+            if (old_source is not None or not old_path) and (new_source is not None or not new_path):
+                summary = summarize_file(path, language, old_source, new_source, file_diff, max_hunk_lines)
+        out.append(summary if summary and len(summary) < len(file_diff) else file_diff)
+    return "".join(out).strip()
@@ -0,0 +1,85 @@
+"""
+Commit a frozen snapshot of the index instead of whatever is staged later.
+
+`git commit` commits the index as it is when it runs, which may no longer
+match the diff the message was generated from if files were staged while
+the model was answering. A snapshot records the index as a tree with
+`git write-tree` up front; the diff is read between that tree and the
+parent commit, and the commit is made with `git commit-tree` and moved onto
+the branch with `git update-ref`, which refuses if the branch has moved
+since the snapshot. Anything staged afterwards simply stays staged.
+
+`git commit-tree` doesn't run the pre-commit or commit-msg hooks.
+"""
+import subprocess
+
+
+def _git(repo, *args, input=None):
+    cmd = ["git", "-C", repo, *args] if repo else ["git", *args]
+    return subprocess.run(
+        cmd, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+
+
+def _check(result, what):
+    if result.returncode != 0:
+        raise RuntimeError(f"{what} failed: {result.stderr.strip() or result.stdout.strip()}")
+    return result.stdout.strip()
+
+
+def take_snapshot(repo=None):
+    """Write the index as a tree and return {"tree", "parent", "ref"} for it.
+
+    parent is the commit HEAD points at (None before the first commit) and
+    ref the branch HEAD points to ("HEAD" when detached).
+    """
+    tree = _check(_git(repo, "write-tree"), "git write-tree")
+    parent = _git(repo, "rev-parse", "--verify", "-q", "HEAD^{commit}").stdout.strip() or None
+    ref = _git(repo, "symbolic-ref", "-q", "HEAD").stdout.strip() or "HEAD"
+    return {"tree": tree, "parent": parent, "ref": ref}
+
+
+def _base_tree(snapshot, repo=None):
+    if snapshot["parent"]:
+        return snapshot["parent"]
+    # Diff a root commit against the empty tree of this repo's hash algorithm
+    return _check(_git(repo, "hash-object", "-t", "tree", "--stdin", input=""), "git hash-object")
+
+
+def snapshot_revs(snapshot, repo=None):
+    """Return the (base, new) trees the snapshot's diff is read between."""
+    return _base_tree(snapshot, repo), snapshot["tree"]
+
+
+def snapshot_diff(snapshot, repo=None):
+    """Return the diff of the snapshot tree against its parent, stripped."""
+    result = _git(repo, "diff-tree", "-p", "-r", "-M", "--no-color", *snapshot_revs(snapshot, repo))
+    return _check(result, "git diff-tree")
+
+def snapshot_files(snapshot, repo=None):
+    """Return the paths changed in the snapshot."""
+    result = _git(repo, "diff-tree", "-r", "-M", "--name-only", *snapshot_revs(snapshot, repo))
+    return _check(result, "git diff-tree").splitlines()
+
+
+def commit_snapshot(snapshot, message, repo=None):
+    """Commit the snapshot tree with message and advance its ref; return the new commit id.
+
+    Raises RuntimeError without touching the ref if it no longer points at
+    the snapshot's parent, e.g. because another commit landed meanwhile.
+    """
+    args = ["commit-tree", snapshot["tree"]]
+    if snapshot["parent"]:
+        args += ["-p", snapshot["parent"]]
+    # Like `git commit`, store the message without surrounding blank lines
+    commit = _check(_git(repo, *args, "-F", "-", input=message.strip() + "\n"), "git commit-tree")
+
+    subject = message.splitlines()[0] if message else ""
+    # The old value makes the update atomic: it only happens if the ref is unchanged
+    result = _git(repo, "update-ref", "-m", f"commit: {subject}", snapshot["ref"], commit, snapshot["parent"] or "")
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"{snapshot['ref']} moved since the snapshot was taken; nothing was committed. "
+            f"The generated commit is {commit[:12]}."
+        )
+    return commit
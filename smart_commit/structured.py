@@ -0,0 +1,150 @@
+"""
+Structured generation: the model fills in commit message fields through the
+provider's JSON schema support, and the message is rendered locally.
+
+OpenAI uses `response_format` with a strict JSON schema, Anthropic a forced
+tool call and Gemini `response_schema`. Emoji and formatting come from the
+config, so every response renders to a valid Conventional Commit.
+"""
+import json
+import re
+
+FIELDS = ("type", "scope", "subject", "body", "breaking")
+
+# Rules about the rendered header, which contradict filling in bare fields
+_FORMAT_RULE = re.compile(r"(?i)\bemoji|output format|type\(scope\)")
+# A leading emoji or :shortcode: on a subject
+_EMOJI_PREFIX = r"(?::\w+:|[^\w\s`'\"(\[]+)"
+
+# Gitmoji shortcodes used by the bundled config.yml
+SHORTCODES = {
+    ":art:": "🎨",
+    ":books:": "📚",
+    ":bug:": "🐛",
+    ":building_construction:": "🏗️",
+    ":construction_worker:": "👷",
+    ":green_heart:": "💚",
+    ":memo:": "📝",
+    ":recycle:": "♻️",
+    ":rewind:": "⏪",
+    ":sparkles:": "✨",
+    ":test_tube:": "🧪",
+    ":white_check_mark:": "✅",
+    ":wrench:": "🔧",
+    ":zap:": "⚡",
+}
+
+
+def message_schema(allowed_types):
+    """Return the JSON schema of the commit message fields."""
+    return {
+        "type": "object",
+        "properties": {
+            "type": {"type": "string", "enum": list(allowed_types)},
+            "scope": {"type": "string", "description": "Noun for the affected area, or empty"},
+            "subject": {"type": "string", "description": "Imperative summary under 72 characters"},
+            "body": {"type": "string", "description": "What changed and why, or empty"},
+            "breaking": {"type": "boolean", "description": "True if the change is not backward-compatible"},
+        },
+        "required": list(FIELDS),
+    }
+
+def strict_schema(schema):
+    """Return schema with additionalProperties disabled, as OpenAI strict mode requires."""
+    return {**schema, "additionalProperties": False}
+
+
+def build_structured_prompt(diff, staged_files, rules, allowed_types):
+    """Build the prompt for structured generation.
+
+    Rules about emoji or the header format are left out; render_message()
+    takes care of both.
+    """
+    rules = "\n".join(f"- {rule}" for rule in rules if not _FORMAT_RULE.search(rule))
+    files = ", ".join(staged_files)
+    return f"""
+You are an expert at writing Git commit messages that follow the Conventional Commits specification.
+
+Describe the change below by filling in the commit message fields. Emoji and
+formatting are added automatically, so don't include them in any field.
+
+- type: one of {", ".join(allowed_types)}
+- scope: a noun for the part of the codebase affected (e.g. api, auth, ui), or "" if none fits
+- subject: imperative, present tense, under 72 characters, no trailing period
+- body: "" for simple changes; otherwise explain what changed and why, with bullet points for multiple changes
+- breaking: true only if the change is not backward-compatible
+
+Guidelines:
+{rules}
+
+Files changed: {files}
+Diff:
+```diff
+{diff}
+```
+"""
+
+
+def parse_fields(raw):
+    """Return the fields dict from a provider response (a dict or JSON text)."""
+    if isinstance(raw, dict):
+        return raw
+    text = raw.strip()
+    # Some OpenAI-compatible servers ignore response_format and wrap JSON in a fence
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.S)
+    if fenced:
+        text = fenced.group(1)
+    fields = json.loads(text)
+    if not isinstance(fields, dict):
+        raise ValueError("Structured response is not a JSON object")
+    return fields
+
+def strip_header(subject, allowed_types):
+    """Remove a `<emoji> type(scope):` prefix, or a lone leading emoji, from subject."""
+    types = "|".join(re.escape(t) for t in allowed_types)
+    match = re.match(rf"(?:{_EMOJI_PREFIX}\s*)?(?:{types})(?:\([^)]*\))?!?:\s*", subject, re.I) \
+        or re.match(rf"{_EMOJI_PREFIX}\s+(?=\w)", subject)
+    return subject[match.end():] if match else subject
+
+def render_message(fields, emoji_map, allowed_types, auto_emoji=True):
+    """Render commit message fields as `<emoji> type(scope)!: subject` plus body."""
+    allowed = list(allowed_types)
+    commit_type = str(fields.get("type") or "").strip().lower()
+    if commit_type not in allowed:
+        # Only possible with providers that don't enforce enums; stay valid anyway
+        commit_type = "chore" if "chore" in allowed else allowed[0]
+
+    scope = re.sub(r"[^\w./-]+", "-", str(fields.get("scope") or "").strip()).strip("-")
+    subject = strip_header(" ".join(str(fields.get("subject") or "").split()), allowed).rstrip(".")
+    if not subject:
+        raise ValueError("Structured response has an empty subject")
+
+    header = f"{commit_type}({scope})" if scope else commit_type
+    if fields.get("breaking") is True:
+        header += "!"
+    header += f": {subject}"
+
+    emoji = emoji_map.get(commit_type, "")
+    emoji = SHORTCODES.get(emoji, emoji)
+    if auto_emoji and emoji:
+        header = f"{emoji} {header}"
+
+    body = str(fields.get("body") or "").strip()
+    return f"{header}\n\n{body}" if body else header
+
+
+def structured_generator(generate, config, with_usage=False):
+    """Wrap a fields-returning generate callable so it returns rendered messages."""
+    def render(raw):
+        return render_message(
+            parse_fields(raw), config.ai.emoji_map, config.commit.allowed_types, config.commit.auto_emoji,
+        )
+
+    if with_usage:
+        def wrapper(prompt):
+            raw, usage = generate(prompt)
+            return render(raw), usage
+    else:
+        def wrapper(prompt):
+            return render(generate(prompt))
+    return wrapper
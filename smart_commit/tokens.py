@@ -0,0 +1,299 @@
+"""
+Prompt sizing and cost estimation before a request is sent.
+
+Local estimators approximate each provider family's tokenizer from the
+text alone (tiktoken is used for OpenAI models when it is installed).
+With `ai.exact_tokens` the provider's count-tokens endpoint is asked
+instead, and the counts are cached in the app dir by prompt hash, so
+re-running on the same diff costs nothing.
+
+plan_request() combines the count with the model's context window and
+prices: it falls back to `ai.fallback_model` when the prompt doesn't fit
+and estimates the cost of the commit, which check_plan() holds against
+`ai.max_cost_per_commit`.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+import click
+
+# Average characters per token for prose/code in each provider family's tokenizer
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "anthropic": 3.5,
+    "google": 4.0,
+}
+
+# Context windows in tokens, matched by model name prefix (longest prefix wins)
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-4-turbo": 128_000,
+    "gpt-3.5-turbo": 16_385,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+    "claude-3": 200_000,
+    "claude-sonnet-4": 200_000,
+    "claude-opus-4": 200_000,
+    "claude-haiku-4": 200_000,
+    "gemini-1.5-pro": 2_097_152,
+    "gemini-1.5-flash": 1_048_576,
+    "gemini-2.0-flash": 1_048_576,
+    "gemini-2.5": 1_048_576,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+# USD per million input/output tokens, matched like CONTEXT_WINDOWS
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "o4-mini": (1.10, 4.40),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-haiku": (0.25, 1.25),
+    "claude-haiku-4": (1.00, 5.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-opus-4": (15.00, 75.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+_WORD = re.compile(r"\w+|[^\w\s]|\s+")
+
+
+def _lookup(table, model):
+    match = max((prefix for prefix in table if model.startswith(prefix)), key=len, default=None)
+    return table[match] if match else None
+
+
+def split_model(spec, default_provider):
+    """Split "provider/model" into (provider, model); a bare name keeps default_provider."""
+    provider, sep, model = spec.partition("/")
+    return (provider, model) if sep else (default_provider, spec)
+
+
+# ── Local estimates ─────────────────────────────────
+
+def _tiktoken_encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text, provider="openai", model=None):
+    """Return a fast local token estimate for text in provider's tokenizer family."""
+    if provider == "openai" and model:
+        encoding = _tiktoken_encoding(model)
+        if encoding is not None:
+            return max(1, len(encoding.encode(text, disallowed_special=())))
+
+    # BPE tokenizers merge common words into one token but split symbols and
+    # long identifiers, so count per piece instead of dividing the whole length
+    chars = CHARS_PER_TOKEN.get(provider, 4.0)
+    tokens = 0
+    for piece in _WORD.findall(text):
+        if piece.isspace():
+            tokens += piece.count("\n") + (1 if len(piece) > 4 else 0)
+        elif len(piece) == 1:
+            tokens += 1
+        else:
+            tokens += max(1, round(len(piece) / chars))
+    return max(1, tokens)
+
+
+# ── Exact counts ────────────────────────────────────
+
+def tokens_path():
+    """Return the path of the token count cache in the app dir."""
+    return os.path.join(click.get_app_dir("smart-commit"), "tokens.db")
+
+
+def _connect():
+    path = tokens_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS counts ("
+        "key TEXT PRIMARY KEY, tokens INTEGER NOT NULL, created REAL NOT NULL)"
+    )
+    return conn
+
+
+def _count_key(provider, model, text):
+    h = hashlib.sha256()
+    for part in (provider, model, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _provider_count(provider, model, text, endpoint=None):
+    """Ask provider's count-tokens endpoint for the size of a one-message prompt."""
+    from smart_commit.main import _api_key, _client_kwargs, genai, load_env
+    load_env()
+    if provider == "openai":
+        import openai as openai_sdk
+        client = openai_sdk.OpenAI(api_key=_api_key("openai", endpoint), **_client_kwargs(endpoint, openai_sdk))
+        # Older SDKs lack this endpoint; count_tokens() then falls back to the estimate
+        return client.responses.input_tokens.count(model=model, input=text).input_tokens
+    if provider == "anthropic":
+        import anthropic as anthropic_sdk
+        client = anthropic_sdk.Anthropic(
+            api_key=_api_key("anthropic", endpoint), **_client_kwargs(endpoint, anthropic_sdk)
+        )
+        return client.messages.count_tokens(
+            model=model, messages=[{"role": "user", "content": text}],
+        ).input_tokens
+    if provider == "google":
+        if genai is None:
+            raise ValueError("Counting Gemini tokens needs the google-generativeai package")
+        if endpoint:
+            genai.configure(
+                api_key=_api_key("google", endpoint),
+                transport="rest",
+                client_options={"api_endpoint": endpoint.base_url} if endpoint.base_url else None,
+                default_metadata=list(endpoint.headers.items()),
+            )
+        else:
+            genai.configure(api_key=_api_key("google", endpoint))
+        return genai.GenerativeModel(model_name=model).count_tokens(text).total_tokens
+    raise ValueError(f"Unknown provider '{provider}'. Choose: google, anthropic, openai")
+
+
+def count_tokens(text, provider, model, endpoint=None, counter=None):
+    """Return (tokens, exact) for text, using the provider's count-tokens endpoint.
+
+    Counts are cached by (provider, model, text). If the endpoint can't be
+    reached the local estimate is returned with exact=False.
+    """
+    key = _count_key(provider, model, text)
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT tokens FROM counts WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        row = None
+    if row is not None:
+        return row[0], True
+
+    try:
+        tokens = (counter or _provider_count)(provider, model, text, endpoint)
+    except Exception:
+        return estimate_tokens(text, provider, model), False
+
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO counts VALUES (?, ?, ?)", (key, tokens, time.time()))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+    return tokens, True
+
+
+# ── Planning ────────────────────────────────────────
+
+def context_window(config, provider, model):
+    """Return the context window of provider/model in tokens."""
+    windows = config.ai.context_windows
+    return (windows.get(f"{provider}/{model}") or windows.get(model)
+            or _lookup(CONTEXT_WINDOWS, model) or DEFAULT_CONTEXT_WINDOW)
+
+
+def model_prices(config, provider, model):
+    """Return (input, output) USD per million tokens for provider/model, or None if unknown."""
+    price = config.ai.prices.get(f"{provider}/{model}") or config.ai.prices.get(model)
+    if price:
+        return price.input, price.output
+    return _lookup(PRICES, model)
+
+
+def _size(config, prompt, provider, model, exact, counter):
+    if exact:
+        return count_tokens(prompt, provider, model, config.ai.endpoints.get(provider), counter=counter)
+    return estimate_tokens(prompt, provider, model), False
+
+
+def plan_request(config, prompt, exact=None, counter=None):
+    """Size prompt and pick the model to send it to.
+
+    Returns a dict with provider, model, input_tokens, output_tokens (the
+    configured max_tokens, an upper bound), exact, context_window, cost in
+    USD (None if the model has no known price), fits and fallback (True if
+    the prompt was moved to ai.fallback_model because it didn't fit).
+    """
+    exact = config.ai.exact_tokens if exact is None else exact
+    provider, model = config.ai.provider, config.ai.model
+    output_tokens = config.ai.max_tokens
+    input_tokens, is_exact = _size(config, prompt, provider, model, exact, counter)
+    window = context_window(config, provider, model)
+    fallback = False
+
+    if input_tokens + output_tokens > window and config.ai.fallback_model:
+        provider, model = split_model(config.ai.fallback_model, provider)
+        input_tokens, is_exact = _size(config, prompt, provider, model, exact, counter)
+        window = context_window(config, provider, model)
+        fallback = True
+
+    prices = model_prices(config, provider, model)
+    cost = None
+    if prices:
+        cost = (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000
+    return {
+        "provider": provider,
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "exact": is_exact,
+        "context_window": window,
+        "cost": cost,
+        "fits": input_tokens + output_tokens <= window,
+        "fallback": fallback,
+    }
+
+
+def check_plan(config, plan):
+    """Raise ValueError if plan doesn't fit its model or exceeds ai.max_cost_per_commit."""
+    if not plan["fits"]:
+        hint = "" if config.ai.fallback_model else " Set ai.fallback_model to a long-context model."
+        raise ValueError(
+            f"Prompt is ~{plan['input_tokens']} tokens, over the {plan['context_window']}-token "
+            f"context window of {plan['provider']}/{plan['model']}.{hint}"
+        )
+    limit = config.ai.max_cost_per_commit
+    if limit is not None and plan["cost"] is not None and plan["cost"] > limit:
+        raise ValueError(
+            f"Estimated cost ${plan['cost']:.4f} exceeds ai.max_cost_per_commit (${limit:.4f}). "
+            "Stage fewer files or raise the limit."
+        )
+
+
+def format_plan(plan):
+    """Return a one-line, human-readable summary of plan."""
+    approx = "" if plan["exact"] else "~"
+    cost = "unknown cost" if plan["cost"] is None else f"~${plan['cost']:.4f}"
+    line = (f"{plan['provider']}/{plan['model']}: {approx}{plan['input_tokens']} input + "
+            f"≤{plan['output_tokens']} output tokens of {plan['context_window']}, {cost}")
+    if plan["fallback"]:
+        line += " (long-context fallback)"
+    return line
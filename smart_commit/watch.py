@@ -0,0 +1,121 @@
+import os
+import subprocess
+import threading
+import time
+
+from smart_commit.cache import get_cached_message, put_cached_message
+from smart_commit.main import (
+    get_git_diff, get_staged_files, make_prompt, message_key, prepare_diff, route_config, safe_echo,
+)
+from smart_commit.router import logged_generator
+from smart_commit.tokens import check_plan, plan_request
+
+
+def git_index_path():
+    """Return the absolute path of the current repository's index file."""
+    path = subprocess.check_output(["git", "rev-parse", "--git-path", "index"], text=True).strip()
+    return os.path.abspath(path)
+
+def _index_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def watch_index(on_change, on_settled, interval=0.5, debounce=1.0, index_path=None, stop_event=None):
+    """Poll the git index and report changes until stop_event is set.
+
+    on_change() is called as soon as the index is modified; on_settled() is
+    called once it has stayed unchanged for `debounce` seconds. The index as
+    it is at startup counts as a change, so it is pre-generated too.
+    """
+    index_path = index_path or git_index_path()
+    stop_event = stop_event or threading.Event()
+
+    last = _index_stamp(index_path)
+    changed_at = time.monotonic()
+    pending = True
+
+    while not stop_event.wait(interval):
+        stamp = _index_stamp(index_path)
+        if stamp != last:
+            last = stamp
+            changed_at = time.monotonic()
+            pending = True
+            on_change()
+        elif pending and time.monotonic() - changed_at >= debounce:
+            pending = False
+            on_settled()
+
+
+class SpeculativeGenerator:
+    """Generate messages for the staged diff in the background into the response cache.
+
+    Diffs are routed and prompts planned like `smart-commit commit` does, so
+    the cache key matches and a prompt over the context window or
+    ai.max_cost_per_commit is never sent; generator_for(provider, model)
+    returns the planned model's generate callable.
+    """
+
+    def __init__(self, generator_for, config):
+        self.generator_for = generator_for
+        self.config = config
+        self._lock = threading.Lock()
+        self._cancelled = None
+
+    def cancel(self):
+        """Cancel the in-flight speculative request, if any.
+
+        Provider SDK calls are blocking and cannot be interrupted, so a
+        cancelled request runs to completion but its result is discarded.
+        """
+        with self._lock:
+            if self._cancelled is not None:
+                self._cancelled.set()
+                self._cancelled = None
+
+    def schedule(self):
+        """Cancel any in-flight request and start generating for the current index."""
+        cancelled = threading.Event()
+        with self._lock:
+            if self._cancelled is not None:
+                self._cancelled.set()
+            self._cancelled = cancelled
+        thread = threading.Thread(target=self._run, args=(cancelled,), daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self, cancelled):
+        # Without the response cache, `commit` would never see the result
+        if not self.config.ai.cache:
+            return
+        started = time.monotonic()
+        try:
+            diff = get_git_diff()
+            if not diff or cancelled.is_set():
+                return
+
+            config, decision = route_config(self.config, diff)
+            prompt = make_prompt(config, prepare_diff(config, diff), get_staged_files())
+            plan = plan_request(config, prompt)
+            key = message_key(plan, prompt)
+            if get_cached_message(key, max_age=config.ai.cache_ttl):
+                return
+
+            started = time.monotonic()
+            check_plan(config, plan)
+            generate = self.generator_for(plan["provider"], plan["model"])
+            if decision:
+                decision.update(provider=plan["provider"], model=plan["model"])
+                generate = logged_generator(generate, decision)
+            message = generate(prompt)
+        except Exception as e:
+            if not cancelled.is_set():
+                safe_echo(f"Speculative generation failed: {e}", err=True)
+            return
+
+        if cancelled.is_set():
+            return
+        put_cached_message(key, message)
+        safe_echo(f"✅ Message ready ({time.monotonic() - started:.1f}s): {message.splitlines()[0]}")